@@ -0,0 +1,727 @@
+#!/usr/bin/env python
+
+""" The simulation proper: a pymunk Space populated with walls, robots, pucks
+and landmarks, stepped in a plain Python loop.  Nothing here needs a window or
+a display server, so an AlvinEngine can be run headless (e.g. for parameter
+sweeps on compute nodes) as fast as the CPU allows.  The pyglet viewer in
+alvin.py is just a front-end on top of an AlvinEngine. """
+
+import pyglet
+
+# Several modules import pyglet.gl for their (optional) visualization code.
+# Without a shadow window that import doesn't need a display.
+pyglet.options['shadow_window'] = False
+
+import pymunk, os, sys, shutil, pickle
+import numpy as np
+
+from math import pi, cos, sin
+from pymunk import Vec2d, ShapeFilter
+from random import seed, randint, choice, getstate, setstate
+
+from puck import Puck
+from landmark import Landmark
+from robot import Robot
+from probe import Probe
+from placement import PlacementGrid
+from common import *
+from sensors import RangeScan, RangeScanner, \
+                    StaticOccluders, ObjectGrid, PuckScanner, RobotScanner
+from sensorsuite import SensorSuite
+from controllerpool import ControllerPool
+from snapshot import WorldSnapshot
+from controllers import *
+from configsingleton import ConfigSingleton
+import analysis
+
+def get_output_dir(config_file, trial_number):
+    # Use the base of the config file's name as the name of the output dir
+    output_dir_base = str.split(config_file, '.')[0]
+    return output_dir_base + '/' + str(trial_number)
+
+class AlvinEngine(object):
+
+    # Flags which determine how manual and controller twists are combined.
+    allow_translation = True
+    allow_rotation = True
+
+    # Analysis related
+    steps = 0
+    capture_interval = 20
+
+    # Size of the cells used to find free positions when creating the world
+    placement_cell_size = 10
+
+    # Uniformly sampled candidates to try once the grid finds no room
+    placement_attempts = 100000
+
+    def __init__(self, config_file, trial_number):
+        self.config_file = config_file
+        self.trial_number = trial_number
+        self.output_dir = get_output_dir(config_file, trial_number)
+        print "OUTPUT DIR: "
+        print self.output_dir
+
+        config = ConfigSingleton.get_instance(config_file)
+
+        # Load parameters from config file.
+        self.width = config.getint("AlvinSim", "width")
+        self.height = config.getint("AlvinSim", "height")
+        self.number_robots = config.getint("AlvinSim", "number_robots")
+        self.number_pucks = config.getint("AlvinSim", "number_pucks")
+        self.number_puck_kinds = config.getint("AlvinSim", "number_puck_kinds")
+        self.number_landmarks = config.getint("AlvinSim", "number_landmarks")
+        self.number_steps = config.getint("AlvinSim", "number_steps")
+        self.puck_ring = config.getboolean("AlvinSim", "puck_ring")
+        self.puck_ring_radius = config.getint("AlvinSim", "puck_ring_radius")
+        self.landmark_ring = config.getboolean("AlvinSim", "landmark_ring")
+        self.landmark_ring_radius = config.getint("AlvinSim", "landmark_ring_radius")
+        self.puck_kinds = range(self.number_puck_kinds)
+        self.wall_thickness = config.getint("AlvinSim", "wall_thickness")
+        self.analyze = config.getboolean("AlvinSim", "analyze")
+        self.capture_screenshots = config.getboolean("AlvinSim", "capture_screenshots")
+        self.visualize_probes = config.getboolean("AlvinSim", "visualize_probes")
+        self.sensor_cell_size = config.getint("AlvinSim", "sensor_cell_size")
+        self.controller_name = config.get("AlvinSim", "controller_name")
+        self.controller_processes = config.getint("AlvinSim",
+                                                  "controller_processes")
+        self.time_step = config.getfloat("AlvinSim", "time_step")
+        self.physics_substeps = config.getint("AlvinSim", "physics_substeps")
+        self.checkpoint_interval = config.getint("AlvinSim",
+                                                 "checkpoint_interval")
+        self.sleep_time_threshold = config.getfloat("AlvinSim",
+                                                    "sleep_time_threshold")
+        self.idle_speed_threshold = config.getfloat("AlvinSim",
+                                                    "idle_speed_threshold")
+
+        # build simulation environment
+        self.env = pymunk.Space()
+        self.env.damping = 0.01 # 99% of velocity is lost per second
+
+        # Geometry of the walls and landmarks, shared by the range scanners.
+        self.static_occluders = StaticOccluders(self.env)
+
+        # Bodies that have moved slower than 'idle_speed_threshold' for
+        # 'sleep_time_threshold' seconds fall asleep and are skipped by the
+        # physics until something touches them.  Robots are kept awake by
+        # their commands, so it is mostly settled pucks that sleep.
+        self.env.sleep_time_threshold = self.sleep_time_threshold
+        self.env.idle_speed_threshold = self.idle_speed_threshold
+        self.awake_bodies = 0
+
+        # Seed random number generator.
+        seed(trial_number)
+
+        # Only used while the world is being built
+        self.placement_grid = PlacementGrid(self.width, self.height,
+                                            self.placement_cell_size)
+
+        # Create the walls, robots, pucks, and landmarks
+        self.create_border_walls()
+        self.create_random_walls()
+        #self.create_one_wall()
+        self.robots = []
+        self.pucks = []
+        self.landmarks = []
+        self.probes = []
+        self.create_robots()
+        if self.puck_ring:
+            self.create_pucks_ring()
+        else:
+            self.create_pucks_random()
+        #self.create_immobile_pucks()
+        #if self.landmark_ring:
+        #    self.create_landmarks_ring()
+        #else:
+        #    self.create_landmarks_random()
+        #self.create_canned_landmarks()
+        if self.visualize_probes:
+            self.create_probe_grid()
+        self.placement_grid = None
+
+        # Indices of the pucks and robots for the scanners which sense them
+        # from their positions alone.
+        self.puck_grid = ObjectGrid(self.pucks, self.width, self.height,
+                                    self.sensor_cell_size)
+        self.robot_grid = ObjectGrid(self.robots, self.width, self.height,
+                                     self.sensor_cell_size)
+        self.object_grids_step = self.steps
+
+        self.controller_pool = None
+        if self.controller_processes > 0:
+            self.controller_pool = ControllerPool(self.controller_processes)
+
+        self.prepare_output_dir()
+
+        self.finished = False
+
+    def prepare_output_dir(self):
+        # Prep the output directory for screenshots, analysis and checkpoints
+        if (self.capture_screenshots or self.analyze or
+            self.checkpoint_interval > 0):
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+            os.makedirs(self.output_dir)
+
+        if self.analyze:
+            analysis.init(self.output_dir)
+
+    def create_border_walls(self):
+        env_b = self.env.static_body
+        walls = []
+        walls.append(self.create_wall(0, 0, self.width, 0))
+        walls.append(self.create_wall(self.width, 0, self.width, self.height))
+        walls.append(self.create_wall(self.width, self.height, 0, self.height))
+        walls.append(self.create_wall(0, self.height, 0,0))
+        for wall_shape in walls:
+            wall_shape.filter = ShapeFilter(categories = WALL_MASK)
+        self.env.add(walls)
+
+    def create_random_walls(self):
+        # A few randomly distributed walls.
+        random_walls = []
+        n = randint(10, 20)
+        #n = 0 # Open environment
+        for i in range(n):
+            x1, y1 = randint(0, self.width), randint(0, self.height)
+            angle = pi/2. * randint(0,3)
+            length = randint(self.wall_thickness, self.width/2)
+            x2, y2 = x1 + length*cos(angle), y1 + length*sin(angle)
+            wall = self.create_wall(x1, y1, x2, y2)
+            random_walls.append(wall)
+        self.env.add(random_walls)
+
+    def create_one_wall(self):
+        x = self.width/2 + 10
+        y1 = self.height/2 - 12
+        y2 = self.height/2 + 12
+        wall = self.create_wall(x, y1, x, y2)
+        self.env.add(wall)
+
+    def create_wall(self, x1, y1, x2, y2):
+        env_b = self.env.static_body
+        wall_shape = pymunk.Segment(env_b, Vec2d(x1,y1), Vec2d(x2,y2), \
+                                    self.wall_thickness)
+        wall_shape.filter = ShapeFilter(categories = WALL_MASK)
+        self.reserve(wall_shape)
+        return wall_shape
+
+    def find_free_position(self, radius, offset, shape=None):
+        """ Return a random position at least 'offset' from the arena's edges
+        where a disc of the given radius overlaps nothing reserved so far.  If
+        the grid finds no room, fall back to uniform sampling, testing 'shape'
+        itself (which the disc bounds) against the Space if it is given. """
+        position = self.placement_grid.place(radius, offset)
+        if position == None:
+            fits = None
+            if shape != None:
+                def fits(x, y):
+                    shape.body.position = x, y
+                    return self.env.shape_query(shape) == []
+            position = self.placement_grid.sample(radius, offset,
+                                                  self.placement_attempts,
+                                                  fits)
+        if position == None:
+            raise RuntimeError("No room left to place an object of radius " +
+                               str(radius))
+        return position
+
+    def reserve(self, shape):
+        """ Record a shape that has been added to the Space so that nothing
+        else gets placed on top of it. """
+        if self.placement_grid == None:
+            return
+        position = shape.body.position
+        if isinstance(shape, pymunk.Circle):
+            self.placement_grid.add_disc(position.x, position.y, shape.radius)
+        elif isinstance(shape, pymunk.Segment):
+            a = shape.body.local_to_world(shape.a)
+            b = shape.body.local_to_world(shape.b)
+            self.placement_grid.add_segment(a.x, a.y, b.x, b.y, shape.radius)
+        else:
+            vertices = [shape.body.local_to_world(v)
+                        for v in shape.get_vertices()]
+            self.placement_grid.add_polygon(vertices, shape.radius)
+
+    def create_robots(self):
+        for i in range(self.number_robots):
+            # We vary the mask used to detect pucks for both the range sensor
+            # and the controller.
+            puck_mask = RED_PUCK_MASK
+
+            robot = Robot()
+            offset = int(self.wall_thickness + robot.radius)
+            # The robot's wedge pokes out beyond its radius, so look for room
+            # for a disc that bounds its whole shape, or failing that for the
+            # shape itself.
+            bounding_radius = max([v.length for v in robot.shape.get_vertices()])
+            robot.body.position = self.find_free_position(bounding_radius,
+                                                          offset, robot.shape)
+            self.env.add(robot.body, robot.shape)
+            self.reserve(robot.shape)
+
+            # Create the robot's sensors
+            robot.range_scanner = RangeScanner("RangeScan:nonlandmarks", WALL_MASK|ROBOT_MASK|ANY_PUCK_MASK|ANY_LANDMARK_MASK, WALL_MASK|ROBOT_MASK|puck_mask, self.static_occluders)
+            #robot.landmark_scanner = RangeScanner("RangeScan:landmarks", WALL_MASK|ANY_LANDMARK_MASK, WALL_MASK|LANDMARK_MASK)
+            robot.landmark_scanner = RangeScanner("RangeScan:landmarks", WALL_MASK|ANY_LANDMARK_MASK, WALL_MASK|ANY_LANDMARK_MASK, self.static_occluders)
+
+            # Create the controller
+            if self.controller_name == "EchoController":
+                robot.controller = EchoController()
+            elif self.controller_name == "SimpleAvoidController":
+                robot.controller = SimpleAvoiderController()
+            elif self.controller_name == "RVOAvoiderController":
+                robot.controller = RVOAvoiderController(1)
+            elif self.controller_name == "OldGauciController":
+                robot.controller = OldGauciController()
+            elif self.controller_name == "GauciController":
+                robot.controller = GauciController(puck_mask)
+            elif self.controller_name == "MyController":
+                robot.controller = MyController(puck_mask)
+            elif self.controller_name == "LeftmostController":
+                robot.controller = LeftmostController(puck_mask)
+            elif self.controller_name == "LandmarkWallController":
+                robot.controller = LandmarkWallController(puck_mask)
+            elif self.controller_name == "PushoutController":
+                robot.controller = PushoutController(puck_mask)
+            elif self.controller_name == "BounceController":
+                robot.controller = BounceController(ANY_LANDMARK_MASK,puck_mask)
+            elif self.controller_name == "LandmarkCircleController":
+                robot.controller = LandmarkCircleController(robot, puck_mask)
+            elif self.controller_name == "FlowController":
+                robot.controller = FlowController(robot, puck_mask)
+
+            # These only sense pucks and robots, from their positions.
+            robot.puck_scanner = PuckScanner()
+            robot.robot_scanner = RobotScanner()
+
+            # The SensorSuite and the batched scans handed to the controller
+            # are refilled every step rather than made anew.
+            robot.sensor_suite = SensorSuite(self, robot)
+            robot.scan_buffers = {}
+
+            self.robots.append(robot)
+
+    def create_pucks_random(self):
+        for i in range(self.number_pucks):
+            puck = Puck(choice(self.puck_kinds))
+            offset = int(self.wall_thickness + puck.radius)
+            puck.body.position = self.find_free_position(puck.radius, offset)
+            self.env.add(puck.body, puck.shape)
+            self.reserve(puck.shape)
+            self.pucks.append(puck)
+
+    def create_pucks_ring(self):
+        centre_x = self.width / 2
+        centre_y = self.height / 2
+        radius = self.puck_ring_radius
+
+        for i in range(self.number_pucks):
+            angle = i / float(self.number_pucks) * 2*pi
+            x = centre_x + radius * cos(angle)
+            y = centre_y + radius * sin(angle)
+            self.create_puck((x, y))
+
+    def create_immobile_pucks(self):
+        x = self.width/6
+        y_top = 2*self.height/3 + 20
+        y_bot = self.height/3 - 20
+
+        self.create_puck((x, y_top), True)
+        self.create_puck((x, y_bot), True)
+
+    def create_puck(self, pos, immobile=False):
+        puck = Puck(choice(self.puck_kinds), immobile=immobile)
+        puck.body.position = pos
+        self.env.add(puck.body, puck.shape)
+        self.reserve(puck.shape)
+        self.pucks.append(puck)
+        return puck
+
+    def create_landmark(self, pos, mask, radius):
+        landmark = Landmark(mask, radius)
+        landmark.body.position = pos
+        self.env.add(landmark.body, landmark.shape)
+        self.reserve(landmark.shape)
+        self.landmarks.append(landmark)
+        return landmark
+
+    def create_canned_landmarks(self):
+        # To form "1 5 0"
+        #self.create_one_landmarks()
+        #self.create_five_landmarks()
+        #self.create_zero_landmarks()
+
+        # To form "C"
+        arc_radius = 20
+        blast_radius = 10
+        x = self.width/2
+        y = self.height/2
+        self.create_landmark((x, y), ARC_LANDMARK_MASK, arc_radius)
+        self.create_landmark((x+15, y), BLAST_LANDMARK_MASK, blast_radius)
+
+    def create_one_landmarks(self):
+        x = self.width/6
+        y_top = 2*self.height/3 + 80
+        y_bot = self.height/3 - 80
+
+        self.create_landmark((x, y_top), POLE_LANDMARK_MASK, 20)
+        self.create_landmark((x, y_bot), POLE_LANDMARK_MASK, 20)
+
+
+    def create_five_landmarks(self):
+        """ Landmarks to create the digit '5' in the centre. """
+        arc_radius = 20
+        blast_radius = 10
+
+        x = self.width/2
+        y_top = 2*self.height/3 - 7
+        y_bot = self.height/3 + 7
+
+        self.create_landmark((x, y_top), ARC_LANDMARK_MASK, arc_radius)
+        self.create_landmark((x, y_bot), ARC_LANDMARK_MASK, arc_radius)
+
+        self.create_landmark((x+15, y_top), BLAST_LANDMARK_MASK, blast_radius)
+        self.create_landmark((x-15, y_bot), BLAST_LANDMARK_MASK, blast_radius)
+
+    def create_zero_landmarks(self):
+        """ Landmarks to help form the digit '0' on the right. """
+        arc_radius = 20
+
+        # A single landmark to form the zero
+        # x = 5*self.width/6
+        # y = self.height/2
+        # self.create_landmark((x, y), ARC_LANDMARK_MASK, 20)
+
+        x = 5*self.width/6
+        y_top = 2*self.height/3 - 7
+        y_mid = self.height/2
+        y_bot = self.height/3 + 7
+
+        self.create_landmark((x, y_top), ARC_LANDMARK_MASK, arc_radius)
+        self.create_landmark((x, y_mid), ARC_LANDMARK_MASK, arc_radius)
+        self.create_landmark((x, y_bot), ARC_LANDMARK_MASK, arc_radius)
+
+    def create_landmarks_ring(self):
+        centre_x = self.width / 2
+        centre_y = self.height / 2
+        radius = self.landmark_ring_radius
+
+        for i in range(self.number_landmarks):
+            angle = i / float(self.number_landmarks) * 2*pi
+            x = centre_x + radius * cos(angle)
+            y = centre_y + radius * sin(angle)
+            self.create_landmark((x, y))
+
+    def create_landmarks_random(self):
+        for i in range(self.number_landmarks):
+            landmark = Landmark(ARC_LANDMARK_MASK, 10)
+            offset = self.wall_thickness + landmark.shape.radius
+            landmark.body.position = self.find_free_position(
+                                        landmark.shape.radius, offset)
+            self.env.add(landmark.body, landmark.shape)
+            self.reserve(landmark.shape)
+            self.landmarks.append(landmark)
+
+    def create_probe_grid(self):
+
+        positions = []
+        delta = 20
+        margin = 20
+        for x in range(margin, self.width - margin, delta):
+            for y in range(margin, self.height - margin, delta):
+                positions.append((x, y))
+
+        for pos in positions:
+            probe = Probe()
+            probe.body.position = pos
+
+            # Create the probe's sensors
+            probe.range_scanner = RangeScanner("RangeScan:nonlandmarks", WALL_MASK|ROBOT_MASK|ANY_PUCK_MASK|ANY_LANDMARK_MASK, WALL_MASK|ROBOT_MASK|RED_PUCK_MASK, self.static_occluders)
+            probe.landmark_scanner = RangeScanner("RangeScan:landmarks", WALL_MASK|ANY_LANDMARK_MASK, WALL_MASK|ANY_LANDMARK_MASK, self.static_occluders)
+
+            self.probes.append(probe)
+
+    def step(self, manual_twist=None):
+        """ Advance the simulation by one control tick of 'time_step' seconds.
+        Every robot senses and reacts once, then the tick is divided into
+        'physics_substeps' equal substeps, each applying the robots' commands
+        and stepping the physics.  The step size never depends on wall-clock
+        time, so a given trial always produces the same trajectory. """
+
+        self.update(self.time_step, manual_twist)
+
+        substep = self.time_step / self.physics_substeps
+        for i in range(self.physics_substeps):
+            for robot in self.robots:
+                robot.control_step(substep)
+            self.env.step(substep)
+
+        # Counting means visiting every body, so it is only done as often as
+        # the analysis is.
+        if (self.sleep_time_threshold != float('inf') and
+            self.steps % self.capture_interval == 0):
+            self.count_awake_bodies()
+
+        if (self.checkpoint_interval > 0 and
+            self.steps % self.checkpoint_interval == 0):
+            self.save_checkpoint(self.output_dir + '/checkpoint.ckpt')
+
+    def count_awake_bodies(self):
+        """ Update the count of dynamic bodies which are awake after this
+        step. """
+        self.awake_bodies = 0
+        for body in self.env.bodies:
+            if body.body_type == pymunk.Body.DYNAMIC and not body.is_sleeping:
+                self.awake_bodies += 1
+
+    def count_reused_scans(self):
+        """ Return (reused, cast): how many range scans have been reused from
+        an earlier step, and how many were cast afresh, by all of the robots'
+        and probes' scanners. """
+        scanners = set()
+        for thing in self.robots + self.probes:
+            scanners.add(thing.range_scanner)
+            scanners.add(thing.landmark_scanner)
+        reused = sum([scanner.scans_reused for scanner in scanners])
+        cast = sum([scanner.scans_cast for scanner in scanners])
+        return reused, cast
+
+    def wake_bodies_touching(self, shape):
+        """ Wake any sleeping bodies overlapping 'shape'.  Needed after moving
+        a static body, which the physics doesn't do on its own. """
+        for info in self.env.shape_query(shape):
+            body = info.shape.body
+            if body.body_type == pymunk.Body.DYNAMIC:
+                body.activate()
+
+    def run(self):
+        """ Step the simulation until 'number_steps' have been taken. """
+        while not self.finished:
+            self.step()
+
+    def finish(self):
+        """ Called once the last step has been taken. """
+        if self.analyze:
+            analysis.save_plots(self.output_dir)
+        if self.controller_pool != None:
+            self.controller_pool.close()
+        self.finished = True
+
+    def save_checkpoint(self, filename):
+        """ Write the complete state of the simulation to 'filename': the
+        Space with all bodies and shapes, the robots, pucks, landmarks and
+        probes (including each robot's controller state) and the state of the
+        'random' module.  Should be called between steps. """
+
+        checkpoint_file = open(filename, 'wb')
+        pickle.dump((self, getstate()), checkpoint_file,
+                    pickle.HIGHEST_PROTOCOL)
+        checkpoint_file.close()
+
+    def update(self, dt, manual_twist=None):
+        if manual_twist is None:
+            manual_twist = Twist()
+
+        # Every robot carries the same kinds of scanner and controller, so
+        # each kind of range scan the controllers use is taken for all of the
+        # robots in one batch.  Scans the controllers don't declare are left
+        # to be taken by the SensorSuite if they're read after all.
+        names = []
+        batches = []
+        commands = None
+        controller = None
+        if len(self.robots) > 0:
+            controller = self.robots[0].controller
+            names = [name for name in ["range_scan", "landmark_scan"]
+                     if name in controller.sensors]
+            batches = [self.scanner_for(self.robots[0], name)
+                           .compute_batch(self.env, self.robots)
+                       for name in names]
+
+            # Controllers which can, react for all of the robots at once.
+            commands = controller.react_batch(self.robots,
+                                              dict(zip(names, batches)))
+
+        if commands != None:
+            (linear, angular) = commands
+            for robot, v, w in zip(self.robots, linear.tolist(),
+                                   angular.tolist()):
+                self.command_robot(robot, manual_twist, v, w)
+        elif (self.controller_pool != None and controller != None and
+              controller.parallel):
+            # The controllers react in the worker processes.
+            all_scans = [self.fill_scan_buffers(robot, i, names, batches)
+                         for i, robot in enumerate(self.robots)]
+            twists = self.controller_pool.react(self.robots, all_scans)
+            for robot, twist in zip(self.robots, twists):
+                self.command_robot(robot, manual_twist, twist.linear,
+                                   twist.angular)
+        else:
+            for i, robot in enumerate(self.robots):
+                scans = self.fill_scan_buffers(robot, i, names, batches)
+                self.update_for_robot(dt, robot, manual_twist, scans)
+            #self.cum_speed += robot.body.velocity.get_length()
+
+        if self.analyze and self.steps % self.capture_interval == 0:
+            analysis.analyze_puck_distribution(self.steps, self.pucks)
+
+        self.steps += 1
+
+        if self.number_steps != -1 and self.steps > self.number_steps:
+            self.finish()
+
+    def take_snapshot(self, snapshot=None, dtype=np.float64):
+        """ Return a WorldSnapshot of the pucks and robots as they are now.
+        A snapshot returned earlier may be passed in to be refilled;
+        otherwise a new one is made with the given dtype (np.float64 or
+        np.float32). """
+        if snapshot == None:
+            snapshot = WorldSnapshot(len(self.pucks), len(self.robots), dtype)
+        snapshot.fill(self.pucks, self.robots, self.steps)
+        return snapshot
+
+    def update_object_grids(self):
+        """ Bring the puck and robot grids up to date with the objects'
+        current positions. """
+        self.puck_grid.update()
+        self.robot_grid.update()
+        self.object_grids_step = self.steps
+
+    def scanner_for(self, robot, name):
+        """ The robot's scanner which takes the named kind of scan. """
+        return getattr(robot, name + "ner")
+
+    def take_scan(self, robot, name, visualize=False):
+        """ Take the named kind of scan (e.g. 'range_scan') from the robot
+        alone.  Called by the SensorSuite for scans not taken in advance. """
+        scanner = self.scanner_for(robot, name)
+        if name == "puck_scan":
+            grid = self.puck_grid
+        elif name == "robot_scan":
+            grid = self.robot_grid
+        else:
+            return scanner.compute(self.env, robot, visualize)
+
+        # The grids are brought up to date at most once per step.
+        if self.object_grids_step != self.steps:
+            self.update_object_grids()
+        return scanner.compute(self.env, robot, grid, visualize)
+
+    def fill_scan_buffers(self, robot, i, names, batches):
+        """ Return the robot's scan buffers (a dictionary keyed by SensorSuite
+        attribute name) holding its scans from the named BatchScans, of which
+        it is the i-th robot.  The RangeScans of the last step are refilled
+        rather than replaced. """
+        buffers = robot.scan_buffers
+        for name, batch in zip(names, batches):
+            buffers[name] = batch.scan(i, buffers.get(name))
+        return buffers
+
+    def update_for_robot(self, dt, robot, manual_twist, scans):
+
+        # First do autonomous control
+        sensor_suite = robot.sensor_suite
+        sensor_suite.reset(scans)
+        controller_twist = robot.controller.react(robot, sensor_suite, False)
+        self.command_robot(robot, manual_twist, controller_twist.linear,
+                           controller_twist.angular)
+
+    def command_robot(self, robot, manual_twist, linear, angular):
+        """ Combine the manual twist and the controller's linear and angular
+        speeds, within the speed limits, into the robot's command.  The
+        robot's existing command Twist is updated in place. """
+
+        # Combine manual and controller twists
+        command_linear = manual_twist.linear
+        command_angular = manual_twist.angular
+        if self.allow_translation:
+            command_linear += linear
+        if self.allow_rotation:
+            command_angular += angular
+
+        if command_linear > MAX_LINEAR_SPEED:
+            command_linear = MAX_LINEAR_SPEED
+        if command_linear < -MAX_LINEAR_SPEED:
+            command_linear = -MAX_LINEAR_SPEED
+        if command_angular > MAX_ANGULAR_SPEED:
+            command_angular = MAX_ANGULAR_SPEED
+        if command_angular < -MAX_ANGULAR_SPEED:
+            command_angular = -MAX_ANGULAR_SPEED
+
+        command = robot.command
+        command.linear = command_linear
+        command.angular = command_angular
+        robot.set_command(command)
+
+
+def read_checkpoint(filename):
+    checkpoint_file = open(filename, 'rb')
+    engine, random_state = pickle.load(checkpoint_file)
+    checkpoint_file.close()
+    return engine, random_state
+
+def load_checkpoint(filename):
+    """ Return the AlvinEngine saved in 'filename', ready to resume where it
+    left off (even if it had finished, e.g. to run it with a larger
+    'number_steps').  The state of the 'random' module is restored with it.
+    Note that pymunk rebuilds the Space with its shapes in a different order
+    (and without its cached contacts), so collisions are resolved in a
+    different order and a resumed run departs from one that was never
+    interrupted once any bodies touch. """
+
+    engine, random_state = read_checkpoint(filename)
+    ConfigSingleton.reset_instance(engine.config_file)
+    setstate(random_state)
+    engine.finished = False
+    if engine.analyze:
+        analysis.init(engine.output_dir)
+    return engine
+
+def fork_checkpoint(filename, trial_number, config_file=None):
+    """ Return the AlvinEngine saved in 'filename' as the starting point of a
+    new trial.  The 'random' module is seeded with 'trial_number' and output
+    goes to that trial's directory.  If 'config_file' is given it replaces the
+    checkpoint's config, which decides 'number_steps' and the output
+    directory.  Parameters that objects read when they were created (e.g.
+    controller gains) keep their checkpointed values. """
+
+    engine, random_state = read_checkpoint(filename)
+    if config_file != None:
+        engine.config_file = config_file
+        config = ConfigSingleton.reset_instance(config_file)
+        engine.number_steps = config.getint("AlvinSim", "number_steps")
+    else:
+        ConfigSingleton.reset_instance(engine.config_file)
+
+    engine.trial_number = trial_number
+    engine.output_dir = get_output_dir(engine.config_file, trial_number)
+    engine.prepare_output_dir()
+    engine.finished = False
+    seed(trial_number)
+    return engine
+
+
+# make module runnable from command line, without a window
+if __name__ == '__main__':
+
+    n = len(sys.argv)
+    config_file = None
+    trial_number = 0
+    if n == 2 and sys.argv[1].endswith('.ckpt'):
+        # Resume from a checkpoint
+        engine = load_checkpoint(sys.argv[1])
+    else:
+        if n == 1:
+            config_file = "default.cfg"
+        elif n == 2:
+            config_file = sys.argv[1]
+        elif n == 3:
+            config_file = sys.argv[1]
+            trial_number = int(sys.argv[2])
+        else:
+            print "usage:\n\talvinengine [config_file] [trial_number]" \
+                  "\n\talvinengine checkpoint_file.ckpt"
+            sys.exit(-1)
+        engine = AlvinEngine(config_file, trial_number)
+
+    engine.run()
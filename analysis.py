@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import pyglet
+import numpy as np
 import matplotlib.pyplot as plt
 from drawing import *
 
@@ -14,35 +15,36 @@ def init(output_dir):
     output_file = open('{}/sec_moment.dat'.format(output_dir), 'wa')
 
 
-def get_sec_moment(pucks):
-    # Find the centroid of all pucks (not including immobile pucks).
-    cx, cy = 0, 0
-    n = 0
-    for puck in pucks:
-        if not puck.immobile:
-            n += 1
-            cx += puck.body.position.x
-            cy += puck.body.position.y
-    if n > 0:
-        cx /= float(n)
-        cy /= float(n)
+def get_sec_moment(pucks, snapshot=None):
+    # The positions of all pucks (not including immobile pucks), one row
+    # per puck, taken from the WorldSnapshot of the pucks if one is given.
+    if snapshot == None:
+        positions = [puck.body.position for puck in pucks
+                     if not puck.immobile]
+        positions = np.array([(p.x, p.y) for p in positions], dtype=float)
+    else:
+        positions = snapshot.puck_positions[~snapshot.puck_immobile]
+        positions = positions.astype(float)
+    n = len(positions)
+    if n == 0:
+        return 0
+
+    # Find the centroid.  cumsum adds in order, as a Python loop would.
+    cx = np.cumsum(positions[:,0])[-1] / float(n)
+    cy = np.cumsum(positions[:,1])[-1] / float(n)
 
     # Show the centroid
     #draw_square((cx, cy), 10, (255, 255, 255), 1)
     
     # Calculate second moment of all pucks, scaled by (4 * radius^2) as per
     # "Clustering Objects with Robots that Do Not Compute":
-    sec_moment = 0
-    for puck in pucks:
-        if not puck.immobile:
-            dx = puck.body.position.x - cx
-            dy = puck.body.position.y - cy
-            sec_moment += dx*dx + dy*dy
-    if n > 0:
-        radius = pucks[0].radius
-        sec_moment /= 4.0 * radius * radius
-
-    return sec_moment
+    dx = positions[:,0] - cx
+    dy = positions[:,1] - cy
+    sec_moment = np.cumsum(dx*dx + dy*dy)[-1]
+    radius = pucks[0].radius
+    sec_moment /= 4.0 * radius * radius
+
+    return float(sec_moment)
 
 def analyze_puck_distribution(steps, pucks):
 
@@ -6,10 +6,19 @@ class Twist(object):
     :ivar roboticsintro.common.Vector linear: linear component of twist
     :ivar float angular: angular component of twist (z-axis rotation)
     """
+    __slots__ = ("linear", "angular")
+
     def __init__(self, linear=0., angular=0.):
         self.linear = linear
         self.angular = angular
 
+    def __getstate__(self):
+        return (self.linear, self.angular)
+
+    def __setstate__(self, (linear, angular)):
+        self.linear = linear
+        self.angular = angular
+
     def __str__(self):
         return "Twist {{linear: {}, angular: {}}}".format(
             self.linear, self.angular)
@@ -24,3 +24,12 @@ class ConfigSingleton(ConfigParser.ConfigParser, object):
             ConfigSingleton.instance = ConfigSingleton(config_file)
         
         return ConfigSingleton.instance
+
+    @staticmethod
+    def reset_instance(config_file):
+        """ Replace the current instance with one read from 'config_file'.
+        Needed when one process runs several configurations in turn (see
+        trialrunner.py). """
+
+        ConfigSingleton.instance = ConfigSingleton(config_file)
+        return ConfigSingleton.instance
@@ -0,0 +1,78 @@
+""" Runs the robots' controllers on a pool of worker processes.  Each robot's
+controller is sent, along with the robot's pose and its scans, to a worker
+which calls react() and sends back the Twist and the controller's state
+(with anything react() changed).  Only worthwhile for controllers expensive
+enough to outweigh the pickling, such as RVOAvoiderController, and only
+correct for those whose react() depends on nothing but its arguments (see
+Controller.parallel). """
+
+from multiprocessing import Pool, current_process
+from pymunk import Vec2d
+
+from sensorsuite import SensorSuite
+
+class BodyState(object):
+    """ The parts of a robot's Body which controllers read. """
+
+    def __init__(self, body):
+        self.position = Vec2d(body.position)
+        self.angle = body.angle
+        self.velocity = Vec2d(body.velocity)
+        self.angular_velocity = body.angular_velocity
+
+class RobotState(object):
+    """ Stands in for a Robot in a worker process. """
+
+    def __init__(self, robot):
+        self.body = BodyState(robot.body)
+        self.radius = robot.radius
+
+class ControllerPool(object):
+
+    def __init__(self, number_processes):
+        self.number_processes = number_processes
+        self.pool = None
+
+    def __getstate__(self):
+        # Worker processes can't be pickled (e.g. in a checkpoint), so the
+        # pool is started again when next needed.
+        state = self.__dict__.copy()
+        state['pool'] = None
+        return state
+
+    def react(self, robots, scans):
+        """ Return a list of the robots' Twists, in order.  'scans' gives
+        each robot's dictionary of scans, which must hold every scan its
+        controller reads.  The state sent back is copied into each robot's
+        own controller, so references to it held elsewhere stay good (what
+        the controller's __getstate__ drops, such as an RVOSwarm, comes back
+        as __getstate__ left it).  A pool can't be started from a daemonic
+        process (e.g. a trialrunner worker), so the controllers are then run
+        right here. """
+        jobs = [(robot.controller, RobotState(robot), robot_scans)
+                for robot, robot_scans in zip(robots, scans)]
+        if current_process().daemon:
+            results = map(react_remotely, jobs)
+        else:
+            if self.pool == None:
+                self.pool = Pool(self.number_processes)
+            chunk_size = max(1, len(jobs) // (4 * self.number_processes))
+            results = self.pool.map(react_remotely, jobs, chunk_size)
+
+        twists = []
+        for robot, (twist, state) in zip(robots, results):
+            robot.controller.__dict__.update(state)
+            twists.append(twist)
+        return twists
+
+    def close(self):
+        """ Stop the worker processes. """
+        if self.pool != None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+def react_remotely((controller, robot, scans)):
+    sensor_suite = SensorSuite(None, robot, scans)
+    twist = controller.react(robot, sensor_suite, False)
+    return twist, controller.__dict__
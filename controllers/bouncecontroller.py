@@ -26,45 +26,11 @@ where the start_angle is the angle where the landmark begins as determined by
 sweeping through the landmark counter-clockwise from directly behind the robot
 (-pi). """
 
-        landmark_span_angles = []
-
-        n = len(lscan.ranges)
-        # Are we starting within a landmark?
-        lmark_at_0 = (lscan.masks[0] & self.landmark_mask != 0)
-        within = lmark_at_0
-
-        #print "\n\n"
-
-        if within:
-            #print "STARTING WITHIN"
-
-            # Special case of starting within a landmark.  Search backwards
-            # from the end of the scan to find where the landmark begins.
-            for i in range(n-1, -1, -1):
-                lmark = (lscan.masks[i] & self.landmark_mask != 0)
-                if not lmark:
-                    start_angle = self.index_to_angle(lscan, (i + 1) % n)
-                    break
-
-        for i in range(1, n):
-            lmark = (lscan.masks[i] & self.landmark_mask != 0)
-            if not within and lmark:
-                # This is the start of a landmark
-                start_angle = self.index_to_angle(lscan, i)
-                within = True
-            if within and not lmark:
-                stop_angle = self.index_to_angle(lscan, i - 1)
-                within = False
-                landmark_span_angles.append((start_angle, stop_angle))
-                #print (degrees(start_angle), degrees(stop_angle))
-                
-        if within and not lmark_at_0:
-            # Special case of a landmark that ends at n - 1
-            stop_angle = self.index_to_angle(lscan, n - 1)
-            landmark_span_angles.append((start_angle, stop_angle))
-            #print (degrees(start_angle), degrees(stop_angle))
-
-        return landmark_span_angles
+        # A landmark which straddles the start (and end) of the scan comes
+        # first.
+        spans = lscan.runs().spans(self.landmark_mask, wrap=True)
+        return [(self.index_to_angle(lscan, first),
+                 self.index_to_angle(lscan, last)) for (first, last) in spans]
                 
     def get_sector_widths(self, span_angles):
         """ Sector width are the angles between adjacent landmarks, defined
@@ -135,31 +101,20 @@ stopping angle of the previous landmark. """
             twist.linear = 10.0
             twist.angular = 5 * sign(normalize_angle_pm_pi(react_angle))
 
-            self.draw_line(this_robot, lscan, lmark_a_angle, (255, 255, 0))
-            self.draw_line(this_robot, lscan, lmark_b_angle, (255, 255, 255))
-            self.draw_line(this_robot, lscan, react_angle, (255, 0, 0))
+            if visualize:
+                self.draw_line(this_robot, lscan, lmark_a_angle, (255, 255, 0))
+                self.draw_line(this_robot, lscan, lmark_b_angle, (255, 255, 255))
+                self.draw_line(this_robot, lscan, react_angle, (255, 0, 0))
         else:
             # Compute centroid of all pucks in the robot's ref. frame
-            cx = 0
-            cy = 0
-            n = len(rscan.ranges)
-            for i in range(n):
-                if rscan.masks[i] & self.acceptable_puck_mask != 0:
-                    angle = self.index_to_angle(rscan, i)
-                    if angle >= pi/2 or angle < -pi/2:
-                        continue
-                    #value = 1.0/rscan.ranges[i]
-                    #value = 1.0/rscan.ranges[i]
-                    value = 1.0
-                    cx = cx + value * cos(angle)
-                    cy = cy + value * sin(angle)
-            cx /= n
-            cy /= n
+            (cx, cy, found) = rscan.centroid(self.acceptable_puck_mask,
+                                             weighted=False)
 
             twist.linear = 10.0
             twist.angular = 100.0 * cy
 
 
-            self.draw_line(this_robot, lscan, 0, (0, 255, 0))
+            if visualize:
+                self.draw_line(this_robot, lscan, 0, (0, 255, 0))
 
         return twist
@@ -1,16 +1,50 @@
 from math import sin, cos
+from common import drawing
 
 """ An abstract class giving the form all concrete controllers should have. """
 class Controller:
 
+    # The scans (attributes of the SensorSuite) which react() reads.  These
+    # are taken for all of the robots in one batch before any of them reacts.
+    # Any other scan is only taken if react() happens to read it.
+    sensors = ["range_scan", "landmark_scan"]
+
+    # Whether react() may be run in another process (see ControllerPool).
+    # That requires react() to read nothing but its scans and the robot's
+    # pose, velocity and radius, and not to draw.
+    parallel = False
+
+    # The names of the states a controller may be in, if it has any.  A
+    # state's code (see state_code) is its index in this list.
+    STATES = []
+
     def react(self, robot, sensor_suite, visualize=False):
         """ Given the robot and it's sensor suite (a dictionary) determine
             how the robot should react by returning a Twist. """
         raise NotImplementedError()
 
+    def react_batch(self, robots, scans):
+        """ Determine how all of the given robots (whose controllers are all
+            of this class) should react, at once.  'scans' is a dictionary
+            of BatchScans from the robots, keyed by SensorSuite attribute
+            name, holding at least the scans in 'sensors'.  Returns arrays
+            (linear, angular) giving each robot's Twist, or None if the
+            robots must react one at a time. """
+        return None
+
+    def state_code(self):
+        """ Return the code of the controller's current state, or -1 if it
+            has no states. """
+        return -1
+
+    def draw_line(self, robot, scan, angle, color):
+        """ Draw a line from the robot along 'angle' (relative to its
+            heading).  Only to be called when visualizing. """
+        drawing.draw_line(robot, scan, angle, color)
+
     def index_to_angle(self, scan, index):
+        """ Return the angle of the scan's ray 'index', or None. """
         if index == None:
             return None
         else:
-            return (scan.ANGLE_MIN + index * 
-                (scan.ANGLE_MAX - scan.ANGLE_MIN) / float(scan.NUMBER_POINTS))
+            return scan.angles[index]
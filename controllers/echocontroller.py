@@ -6,6 +6,8 @@ from common import Twist
 
 class EchoController(Controller):
 
+    sensors = []
+
     def react(self, this_robot, sensor_suite, visualize=False):
         twist = Twist()
 
@@ -9,6 +9,8 @@ from configsingleton import ConfigSingleton
 
 class FlowController(Controller):
 
+    STATES = ["FLOW", "WANDER", "POKE"]
+
     def __init__(self, this_robot, puck_mask):
         """
         puck_mask -- The mask for pucks this controller recognizes
@@ -54,32 +56,13 @@ class FlowController(Controller):
 
     def get_lmark_dist_angle_mask(self, sensor_suite):
         """ Return the distance and angle of the closest landmark. """
-    
-        lscan = sensor_suite.landmark_scan
-        closest_lmark_distance = float('inf')
-        closest_lmark_angle = None
-        closest_lmark_mask = None
-        for i in range(len(lscan.ranges)):
-            if (lscan.masks[i] & ANY_LANDMARK_MASK != 0
-               and lscan.ranges[i] < closest_lmark_distance):
-                closest_lmark_distance = lscan.ranges[i]
-                closest_lmark_angle = lscan.angles[i]
-                closest_lmark_mask = lscan.masks[i]
-        if closest_lmark_angle == None:
-            return None, None, None
-        
-        return closest_lmark_distance, closest_lmark_angle, closest_lmark_mask
+        return sensor_suite.landmark_scan.closest(ANY_LANDMARK_MASK)
 
     def get_leftmost_puck_index(self, rscan):
-        # Go through the scan from left to right (descending order of index)
-        # and choose the leftmost pixel.
-        target = None
-        n = len(rscan.ranges)
-        for i in range(n-1, -1, -1):
-            if rscan.masks[i] & self.puck_mask != 0:
-                target = i
-                break
-        return target
+        return rscan.leftmost(self.puck_mask)
+
+    def state_code(self):
+        return self.STATES.index(self.state)
 
     def react(self, this_robot, sensor_suite, visualize=False):
 
@@ -101,8 +84,9 @@ class FlowController(Controller):
                            sin(leftmost_puck_angle) * sin(lmark_angle + pi/2))
             if dot_product > 0:
                 pokable = True
-                draw_line(this_robot, sensor_suite.range_scan, lmark_angle, (255, 255, 255))
-                draw_line(this_robot, sensor_suite.range_scan, leftmost_puck_angle, (255, 0, 0))
+                if visualize:
+                    draw_line(this_robot, sensor_suite.range_scan, lmark_angle, (255, 255, 255))
+                    draw_line(this_robot, sensor_suite.range_scan, leftmost_puck_angle, (255, 0, 0))
 
         # Handle state transitions
         if self.state == "FLOW":
@@ -1,5 +1,6 @@
 """ A variant on Gauci et al's controller from 'Clustering objects with robots that do not compute'. """
 
+import numpy as np
 from controller import Controller
 from math import fabs, pi
 from common import *
@@ -27,12 +28,8 @@ class GauciController(Controller):
 
         # EXPERIMENT TO ACHIEVE A MINIMUM SIZE AGGREGATE.
         lscan = sensor_suite.landmark_scan
-        closest_lmark_distance = float('inf')
-        for i in range(len(lscan.ranges)):
-            if (lscan.masks[i] & ARC_LANDMARK_MASK != 0
-               and lscan.ranges[i] < closest_lmark_distance):
-                closest_lmark_distance = lscan.ranges[i]
-        if closest_lmark_distance < 200:
+        closest_lmark_distance = lscan.closest(ARC_LANDMARK_MASK)[0]
+        if closest_lmark_distance != None and closest_lmark_distance < 200:
             centre_angle = 0.3
 
         # Relying on only a single forward-pointing ray causes distant pucks
@@ -40,14 +37,10 @@ class GauciController(Controller):
         # attract the robot).  We accept as forward-pointing any sensor ray
         # within 'front_angle_threshold' of zero.  Correspondingly set the
         # two predicates 'react_to_puck' and 'react_to_robot'.
-        react_to_puck = False
-        react_to_robot = False
-        for i in range(n):
-            if fabs(scan.angles[i] + centre_angle) <self.front_angle_threshold:
-                if (scan.masks[i] & self.puck_mask) != 0:
-                    react_to_puck = True
-                if scan.masks[i] == ROBOT_MASK:
-                    react_to_robot = True
+        react_to_puck = scan.in_front(self.puck_mask,
+                                      self.front_angle_threshold, centre_angle)
+        react_to_robot = scan.in_front(ROBOT_MASK, self.front_angle_threshold,
+                                       centre_angle)
 
         if react_to_robot:
             react_to_puck = False
@@ -76,3 +69,26 @@ class GauciController(Controller):
                 self.draw_line(this_robot, scan, 0, (0, 255, 0))
                 
         return twist
+
+    def react_batch(self, robots, scans):
+        """ The same as react() for every robot at once. """
+        scan = scans["range_scan"]
+        lscan = scans["landmark_scan"]
+
+        # Aim off to the side when an arc landmark is close.
+        near_lmark = ((lscan.masks & ARC_LANDMARK_MASK != 0) &
+                      (lscan.ranges < 200)).any(axis=1)
+        centre_angles = np.where(near_lmark, 0.3, 0)
+
+        front = (np.abs(scan.geometry.angle_array + centre_angles[:,None]) <
+                 self.front_angle_threshold)
+        react_to_robot = (front & (scan.masks == ROBOT_MASK)).any(axis=1)
+        react_to_puck = ((front & (scan.masks & self.puck_mask != 0))
+                         .any(axis=1) & ~react_to_robot)
+
+        linear = np.where(react_to_robot,
+                          self.linear_speed * self.slow_factor,
+                          self.linear_speed)
+        angular = np.where(react_to_puck | react_to_robot,
+                           self.angular_speed, -self.angular_speed)
+        return linear, angular
@@ -8,6 +8,8 @@ from configsingleton import ConfigSingleton
 
 class ImageController(Controller):
 
+    sensors = ["range_scan"]
+
     def __init__(self, acceptable_puck_mask):
         self.acceptable_puck_mask = acceptable_puck_mask
 
@@ -30,7 +32,7 @@ class ImageController(Controller):
         if target == None:
             target_angle = None
         else:
-            target_angle = (rscan.ANGLE_MIN + target * (rscan.ANGLE_MAX - rscan.ANGLE_MIN) / float(rscan.NUMBER_POINTS))
+            target_angle = rscan.angles[target]
 
         if self.modulate and target_angle != None:
             compass_angle = normalize_angle_pm_pi(this_robot.body.angle)
@@ -48,8 +50,7 @@ class ImageController(Controller):
             if (rscan.masks[i] == ROBOT_MASK and fabs(rscan.angles[i]) < pi/4 and
                 rscan.ranges[i] < 2*this_robot.radius):
                 react_to_robot = True
-                react_to_robot_angle = (rscan.ANGLE_MIN + i * 
-                    (rscan.ANGLE_MAX - rscan.ANGLE_MIN) / float(rscan.NUMBER_POINTS))
+                react_to_robot_angle = rscan.angles[i]
 
         if react_to_robot:
             # Turn left and slow
@@ -13,6 +13,9 @@ from configsingleton import ConfigSingleton
 
 class LandmarkCircleController(Controller):
 
+    # The states of innies.  Outies have none.
+    STATES = ["PUSHING", "HOMING"]
+
     def __init__(self, this_robot, puck_mask):
         """
         puck_mask -- The mask for pucks this controller recognizes
@@ -63,42 +66,12 @@ class LandmarkCircleController(Controller):
 
     def get_lmark_dist_angle_mask(self, sensor_suite):
         """ Return the distance and angle of the closest landmark. """
-    
-        lscan = sensor_suite.landmark_scan
-        closest_lmark_distance = float('inf')
-        closest_lmark_angle = None
-        closest_lmark_mask = None
-        for i in range(len(lscan.ranges)):
-            if (lscan.masks[i] & ANY_LANDMARK_MASK != 0
-               and lscan.ranges[i] < closest_lmark_distance):
-                closest_lmark_distance = lscan.ranges[i]
-                closest_lmark_angle = lscan.angles[i]
-                closest_lmark_mask = lscan.masks[i]
-        if closest_lmark_angle == None:
-            return None, None, None
-        
-        return closest_lmark_distance, closest_lmark_angle, closest_lmark_mask
+        return sensor_suite.landmark_scan.closest(ANY_LANDMARK_MASK)
 
     def pushout_behaviour(self, this_robot, scan):
         # Push out pucks by moving towards the weighted centroid of all
         # visible pucks.  Nearby pucks get more weight and will be targeted.
-        cx = 0
-        cy = 0
-        pucks_in_view = False
-        n = len(scan.ranges)
-        for i in range(n):
-            if scan.masks[i] & self.puck_mask != 0:
-                angle = self.index_to_angle(scan, i)
-                if angle >= pi/2 or angle < -pi/2:
-                    continue
-                value = 1.0/(1.0 + scan.ranges[i])
-                #value = 1.0/scan.ranges[i]
-                #value = 1.0
-                cx = cx + value * cos(angle)
-                cy = cy + value * sin(angle)
-                pucks_in_view = True
-        cx /= n
-        cy /= n
+        (cx, cy, pucks_in_view) = scan.centroid(self.puck_mask)
 
         twist = Twist()
         if pucks_in_view:
@@ -138,6 +111,11 @@ class LandmarkCircleController(Controller):
 
         return twist
 
+    def state_code(self):
+        if self.outie:
+            return -1
+        return self.STATES.index(self.innie_state)
+
     def react(self, this_robot, sensor_suite, visualize=False):
 
         # Toggle outie with a small probability
@@ -190,24 +168,19 @@ class LandmarkCircleController(Controller):
         # within 'front_angle_threshold' of zero.  Correspondingly set the
         # two predicates 'react_to_puck' and 'react_to_robot'.
         react_to_puck = False
-        react_to_robot = False
 
         # We will treat POLE landmarks as pucks.  See if one is centred.
         if lmark_mask == POLE_LANDMARK_MASK:
             lscan = sensor_suite.landmark_scan
-            nl = len(lscan.ranges)
-            for i in range(nl):
-                if (fabs(lscan.angles[i] + centre_angle) <
-                   2*self.front_angle_threshold):
-                    if (lscan.masks[i] & POLE_LANDMARK_MASK) != 0:
-                        react_to_puck = True
-
-        for i in range(n):
-            if fabs(scan.angles[i] + centre_angle) <self.front_angle_threshold:
-                if (scan.masks[i] & self.puck_mask) != 0:
-                    react_to_puck = True
-                if scan.masks[i] == ROBOT_MASK:
-                    react_to_robot = True
+            react_to_puck = lscan.in_front(POLE_LANDMARK_MASK,
+                                           2*self.front_angle_threshold,
+                                           centre_angle)
+
+        if scan.in_front(self.puck_mask, self.front_angle_threshold,
+                         centre_angle):
+            react_to_puck = True
+        react_to_robot = scan.in_front(ROBOT_MASK, self.front_angle_threshold,
+                                       centre_angle)
 
         if react_to_robot:
             react_to_puck = False
@@ -19,29 +19,17 @@ class LandmarkWallController(Controller):
 
     def get_all_landmarks_leftmost_indices(self, lscan):
 
-        # First find the index of the leftmost landmark
+        # The leftmost pixels of the leftmost landmark and of the next one
+        # to its right (if any).
+        spans = lscan.runs().spans(ANY_LANDMARK_MASK)
         left_index = None
-        n = len(lscan.ranges)
-        for i in range(n-1, -1, -1):
-            if lscan.masks[i] & ANY_LANDMARK_MASK != 0:
-                left_index = i
-                break
+        right_index = None
+        if len(spans) > 0:
+            left_index = spans[-1][1]
+        if len(spans) > 1:
+            right_index = spans[-2][1]
         print left_index
 
-        # Now, "get through" the rest of the leftmost landmark pixels (if any)
-        non_lmark_index = None
-        for i in range(left_index, -1, -1):
-            if lscan.masks[i] & ANY_LANDMARK_MASK == 0:
-                non_lmark_index = i
-                break
-
-        # Now get the leftmost pixel of the next landmark
-        right_index = None
-        for i in range(non_lmark_index, -1, -1):
-            if lscan.masks[i] & ANY_LANDMARK_MASK != 0:
-                right_index = i
-                break
-            
         return (left_index, right_index)
 
 
@@ -64,8 +52,9 @@ class LandmarkWallController(Controller):
         (left, right) = self.get_closest_landmark_pair_leftmost_indices(lscan)
         (left_angle, right_angle) = (self.index_to_angle(lcan, left), self.index_to_angle(lcan, left))
 
-        self.draw_line(this_robot, rscan, left_angle, (255, 0, 0))
-        self.draw_line(this_robot, rscan, right_angle, (0, 255, 0))
+        if visualize:
+            self.draw_line(this_robot, rscan, left_angle, (255, 0, 0))
+            self.draw_line(this_robot, rscan, right_angle, (0, 255, 0))
 
 #
 #    def react(self, this_robot, sensor_suite, visualize=False):
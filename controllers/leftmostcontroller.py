@@ -4,6 +4,7 @@ line-of-sight concept.
 """
 
 import pyglet
+import numpy as np
 from controller import Controller
 from math import fabs, pi, sin, cos
 from random import random
@@ -33,15 +34,7 @@ class LeftmostController(Controller):
         self.summed_angular_speed = 0
 
     def get_leftmost_pixel(self, rscan):
-        # Go through the scan from left to right (descending order of index)
-        # and choose the leftmost pixel.
-        target = None
-        n = len(rscan.ranges)
-        for i in range(n-1, -1, -1):
-            if rscan.masks[i] & self.acceptable_puck_mask != 0:
-                target = i
-                break
-        return target
+        return rscan.leftmost(self.acceptable_puck_mask)
 
     def react(self, this_robot, sensor_suite, visualize=False):
         twist = Twist()
@@ -59,12 +52,9 @@ class LeftmostController(Controller):
 
         # EXPERIMENT TO ACHIEVE A MINIMUM SIZE AGGREGATE.
         lscan = sensor_suite.landmark_scan
-        closest_lmark_distance = float('inf')
-        for i in range(len(lscan.ranges)):
-            if (lscan.masks[i] & ANY_LANDMARK_MASK != 0
-               and lscan.ranges[i] < closest_lmark_distance):
-                closest_lmark_distance = lscan.ranges[i]
-        if closest_lmark_distance < self.circle_radius:
+        closest_lmark_distance = lscan.closest(ANY_LANDMARK_MASK)[0]
+        if (closest_lmark_distance != None and
+            closest_lmark_distance < self.circle_radius):
             target_angle = target_angle + self.egress_angle
         
         if self.modulate and target_angle != None:
@@ -83,8 +73,7 @@ class LeftmostController(Controller):
             if (rscan.masks[i] == ROBOT_MASK and fabs(rscan.angles[i]) < pi/4 and
                 rscan.ranges[i] < 2*this_robot.radius):
                 react_to_robot = True
-                react_to_robot_angle = (rscan.ANGLE_MIN + i * 
-                    (rscan.ANGLE_MAX - rscan.ANGLE_MIN) / float(rscan.NUMBER_POINTS))
+                react_to_robot_angle = rscan.angles[i]
 
         if react_to_robot:
             # Turn left and slow
@@ -116,3 +105,43 @@ class LeftmostController(Controller):
         #print self.summed_angular_speed
 
         return twist
+
+    def react_batch(self, robots, scans):
+        """ The same as react() for every robot at once. """
+        rscan = scans["range_scan"]
+        lscan = scans["landmark_scan"]
+        geometry = rscan.geometry
+        n = geometry.NUMBER_POINTS
+
+        # The leftmost puck pixel, as an angle.
+        puck_pixels = rscan.masks & self.acceptable_puck_mask != 0
+        has_target = puck_pixels.any(axis=1)
+        targets = n - 1 - np.argmax(puck_pixels[:,::-1], axis=1)
+        target_angles = geometry.angle_array[targets]
+
+        near_lmark = ((lscan.masks & ANY_LANDMARK_MASK != 0) &
+                      (lscan.ranges < self.circle_radius)).any(axis=1)
+        if (near_lmark & ~has_target).any():
+            # react() fails here; let it.
+            return None
+        target_angles[near_lmark] += self.egress_angle
+
+        if self.modulate:
+            compass_angles = np.array([normalize_angle_pm_pi(robot.body.angle)
+                                       for robot in robots])
+            dig_in = np.cos(2*compass_angles) < 0
+            target_angles[dig_in] -= self.ingress_angle
+            target_angles[~dig_in] += self.egress_angle
+
+        radii = np.array([robot.radius for robot in robots])
+        react_to_robot = ((rscan.masks == ROBOT_MASK) &
+                          (np.abs(geometry.angle_array) < pi/4) &
+                          (rscan.ranges < 2*radii[:,None])).any(axis=1)
+        turn_left = react_to_robot | (has_target & (target_angles > 0))
+
+        linear = np.where(react_to_robot, self.slow_factor * self.linear_speed,
+                          self.linear_speed)
+        angular = np.where(turn_left, self.angular_speed, -self.angular_speed)
+        for robot, speed in zip(robots, angular.tolist()):
+            robot.controller.summed_angular_speed += speed
+        return linear, angular
@@ -9,6 +9,8 @@ from common.angles import normalize_angle_pm_pi
 
 class MyController(Controller):
 
+    sensors = ["range_scan"]
+
     def __init__(self, acceptable_puck_mask):
         self.acceptable_puck_mask = acceptable_puck_mask
         self.current_puck_type = None
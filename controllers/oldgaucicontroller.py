@@ -6,6 +6,8 @@ FRONT_THRESHOLD = 10.0 * pi / 180.0
 
 class OldGauciController(Controller):
 
+    sensors = ["puck_scan", "robot_scan"]
+
     def react(self, this_robot, sensor_suite, visualize=False):
         twist = Twist()
 
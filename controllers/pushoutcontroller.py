@@ -11,6 +11,8 @@ from configsingleton import ConfigSingleton
 
 class PushoutController(Controller):
 
+    STATES = ["PUSHING", "HOMING"]
+
     def __init__(self, acceptable_puck_mask):
         self.acceptable_puck_mask = acceptable_puck_mask
 
@@ -29,6 +31,9 @@ class PushoutController(Controller):
         # Possible states are PUSHING and HOMING
         self.state = "PUSHING"
 
+    def state_code(self):
+        return self.STATES.index(self.state)
+
     def react(self, this_robot, sensor_suite, visualize=False):
         twist = Twist()
 
@@ -38,14 +43,9 @@ class PushoutController(Controller):
         # outside the circle
         inside = False
         lscan = sensor_suite.landmark_scan
-        closest_lmark_distance = float('inf')
-        closest_lmark_angle = None
-        for i in range(len(lscan.ranges)):
-            if (lscan.masks[i] & ANY_LANDMARK_MASK != 0
-               and lscan.ranges[i] < closest_lmark_distance):
-                closest_lmark_distance = lscan.ranges[i]
-                closest_lmark_angle = lscan.angles[i]
-        if (closest_lmark_distance == float('inf') or  # No landmarks
+        (closest_lmark_distance, closest_lmark_angle, closest_lmark_mask) = \
+                                            lscan.closest(ANY_LANDMARK_MASK)
+        if (closest_lmark_distance == None or  # No landmarks
            closest_lmark_distance < self.circle_radius):
             inside = True
 
@@ -64,23 +64,7 @@ class PushoutController(Controller):
         if self.state == "PUSHING":
             # Push out pucks by moving towards the weighted centroid of all
             # visible pucks.  Nearby pucks get more weight and will be targeted.
-            cx = 0
-            cy = 0
-            pucks_in_view = False
-            n = len(rscan.ranges)
-            for i in range(n):
-                if rscan.masks[i] & self.acceptable_puck_mask != 0:
-                    angle = self.index_to_angle(rscan, i)
-                    if angle >= pi/2 or angle < -pi/2:
-                        continue
-                    value = 1.0/(1.0 + rscan.ranges[i])
-                    #value = 1.0/rscan.ranges[i]
-                    #value = 1.0
-                    cx = cx + value * cos(angle)
-                    cy = cy + value * sin(angle)
-                    pucks_in_view = True
-            cx /= n
-            cy /= n
+            (cx, cy, pucks_in_view) = rscan.centroid(self.acceptable_puck_mask)
 
             if pucks_in_view:
                 twist.linear = self.linear_speed
@@ -90,7 +74,8 @@ class PushoutController(Controller):
                 twist.linear = self.linear_speed
                 twist.angular = 5 * (random() - 0.5)
 
-            self.draw_line(this_robot, lscan, 0, (0, 255, 0))
+            if visualize:
+                self.draw_line(this_robot, lscan, 0, (0, 255, 0))
         else:
 
             # Home towards the landmark.
@@ -1,7 +1,10 @@
 from controller import Controller
 import rvo2, pyglet
+import numpy as np
+from pymunk import Circle, Segment
 from common import Twist, M_TO_PIXELS, MAX_LINEAR_SPEED, MAX_ANGULAR_SPEED
 from math import cos, sin, sqrt, pi, atan2
+from configsingleton import ConfigSingleton
 
 """
 A reactive collision avoidance strategy which makes use of the RVO2 library.
@@ -11,6 +14,9 @@ Important: All units in pixels!
 
 class RVOAvoiderController(Controller):
 
+    sensors = ["range_scan"]
+    parallel = True
+
     NUMBER_PREF_VELS = 11
     ANGLE_MIN = -pi/2.0
     ANGLE_MAX = pi/2.0
@@ -20,6 +26,19 @@ class RVOAvoiderController(Controller):
 
         self.SIM_STEPS = sim_steps
 
+        config = ConfigSingleton.get_instance()
+        self.shared = config.getboolean("RVOAvoiderController", "shared")
+        self.neighbor_distance = config.getfloat("RVOAvoiderController",
+                                                 "neighbor_distance")
+        self.max_neighbors = config.getint("RVOAvoiderController",
+                                           "max_neighbors")
+
+        # In shared mode every robot is an agent of one RVOSwarm (created on
+        # the first step) and no range scan is needed.
+        self.swarm = None
+        if self.shared:
+            self.sensors = []
+
         # Angles of preferred velocities that will be tested each iteration.
         angles = []
         angle_delta = (self.ANGLE_MAX - self.ANGLE_MIN) / \
@@ -35,6 +54,32 @@ class RVOAvoiderController(Controller):
         self.last_index = angles.index(0)
         self.last_mag = float('inf')
 
+    def __getstate__(self):
+        # The RVO simulator can't be pickled, so a checkpointed swarm is
+        # rebuilt on the first step after it is loaded.
+        state = self.__dict__.copy()
+        state['swarm'] = None
+        return state
+
+    def candidate_range(self):
+        """ Return the (start, stop) indices (inclusive) of the preferred
+        velocities to test this time. """
+
+        # To prevent oscillation we will generally just test the preferred
+        # velocities in the immediate neighbourhood (within the pref_vels list)
+        # of the preferred velocity chosen last time.
+        if self.last_mag < 20:
+            # Last time the magnitude of the chosen velocity was very low.
+            # Do a full search over the preferred velocities.
+            return (0, self.NUMBER_PREF_VELS - 1)
+        elif self.last_index == 0:
+            return (0, 1)
+        elif self.last_index == len(self.pref_vels)-1:
+            return (self.NUMBER_PREF_VELS - 2, self.NUMBER_PREF_VELS - 1)
+        else:
+            # This is the general case.
+            return (self.last_index - 1, self.last_index + 1)
+
     def draw_line_from_robot(self, robot, vx, vy, red, green, blue, thickness):
         x1 = (robot.body.position.x)
         y1 = (robot.body.position.y)
@@ -111,24 +156,7 @@ class RVOAvoiderController(Controller):
                   robot.body.velocity.y * cos_theta
 
 
-        # To prevent oscillation we will generally just test the preferred
-        # velocities in the immediate neighbourhood (within the pref_vels list)
-        # of the preferred velocity chosen last time.
-        if self.last_mag < 20:
-            # Last time the magnitude of the chosen velocity was very low.
-            # Do a full search over the preferred velocities.
-            start_index = 0
-            stop_index = self.NUMBER_PREF_VELS - 1
-        elif self.last_index == 0:
-            start_index = 0
-            stop_index = 1
-        elif self.last_index == len(self.pref_vels)-1:
-            start_index = self.NUMBER_PREF_VELS - 2
-            stop_index = self.NUMBER_PREF_VELS - 1
-        else:
-            # This is the general case.
-            start_index = self.last_index - 1
-            stop_index = self.last_index + 1
+        (start_index, stop_index) = self.candidate_range()
 
         highest_mag = 0
         chosen_vel = None
@@ -181,3 +209,138 @@ class RVOAvoiderController(Controller):
             #for r in range_scan.ranges:
             #    print r
         return twist
+
+    def react_batch(self, robots, scans):
+        """ In shared mode, choose every robot's velocity with the RVOSwarm.
+        Otherwise each robot reacts on its own. """
+        if not self.shared:
+            return None
+        if self.swarm == None:
+            self.swarm = RVOSwarm(robots, self)
+        return self.swarm.react(robots)
+
+class RVOSwarm(object):
+    """ One RVO simulator, in world coordinates, shared by all of the robots.
+    Each robot is an agent, so neighbouring robots are avoided as agents
+    rather than as points of a range scan.  The static shapes (walls,
+    landmarks and immobile pucks) become the simulator's obstacles.  RVO2
+    can't remove obstacles, so the simulator is built again whenever the
+    static shapes change (see StaticOccluders.invalidate).  Movable pucks,
+    which react() avoids as part of the range scan, are ignored here, so
+    this is a different behaviour rather than just a faster one.  Each step the candidate preferred velocities of all robots are
+    tested together: the i-th candidates of every robot in the same
+    doStep(). """
+
+    # Number of vertices of the polygon standing in for a circular obstacle.
+    CIRCLE_VERTICES = 8
+
+    def __init__(self, robots, controller):
+        self.controller = controller
+        self.static_occluders = robots[0].range_scanner.static_occluders
+
+        # The StaticOccluders version for which the simulator was built.
+        self.version = None
+        self.sim = None
+        self.agents = None
+
+    def build(self, robots):
+        """ Make a new simulator with the current static shapes as
+        obstacles and an agent for each robot. """
+        self.sim = rvo2.PyRVOSimulator(1/60., # Time step
+                                       self.controller.neighbor_distance,
+                                       self.controller.max_neighbors,
+                                       1.5,   # timeHorizon (other agents)
+                                       1.5,   # timeHorizon (obstacles)
+                                       robots[0].radius,   # agent radius
+                                       MAX_LINEAR_SPEED)   # agent max speed
+        for shape in self.static_occluders.shapes():
+            vertices = obstacle_vertices(shape, self.CIRCLE_VERTICES)
+            if vertices != None:
+                self.sim.addObstacle(vertices)
+        self.sim.processObstacles()
+
+        self.agents = [self.sim.addAgent(tuple(robot.body.position))
+                       for robot in robots]
+        self.version = self.static_occluders.version
+
+    def react(self, robots):
+        """ Return arrays (linear, angular) of the robots' Twists, chosen as
+        RVOAvoiderController.react() chooses them. """
+        if self.version != self.static_occluders.version:
+            self.build(robots)
+        sim = self.sim
+        controllers = [robot.controller for robot in robots]
+        positions = [tuple(robot.body.position) for robot in robots]
+        velocities = [tuple(robot.body.velocity) for robot in robots]
+        cosines = [cos(robot.body.angle) for robot in robots]
+        sines = [sin(robot.body.angle) for robot in robots]
+        ranges = [controller.candidate_range() for controller in controllers]
+
+        highest_mags = [0] * len(robots)
+        chosen_vels = [None] * len(robots)
+        chosen_indices = [None] * len(robots)
+        rounds = max([stop - start + 1 for (start, stop) in ranges])
+        for j in range(rounds):
+            # Robots with fewer candidates repeat their last one.
+            for i, agent in enumerate(self.agents):
+                (start, stop) = ranges[i]
+                (px, py) = controllers[i].pref_vels[min(start + j, stop)]
+                sim.setAgentPosition(agent, positions[i])
+                sim.setAgentVelocity(agent, velocities[i])
+                sim.setAgentPrefVelocity(agent,
+                                         (px * cosines[i] - py * sines[i],
+                                          px * sines[i] + py * cosines[i]))
+
+            for k in range(controllers[0].SIM_STEPS):
+                sim.doStep()
+
+            for i, agent in enumerate(self.agents):
+                (start, stop) = ranges[i]
+                if start + j > stop:
+                    continue
+
+                # Into the robot's frame of reference.
+                (wx, wy) = sim.getAgentVelocity(agent)
+                vx = wx * cosines[i] + wy * sines[i]
+                vy = -wx * sines[i] + wy * cosines[i]
+                mag = sqrt(vx*vx + vy*vy)
+                if mag > highest_mags[i]:
+                    highest_mags[i] = mag
+                    chosen_vels[i] = (vx, vy)
+                    chosen_indices[i] = start + j
+
+        linear = np.zeros(len(robots))
+        angular = np.zeros(len(robots))
+        for i, controller in enumerate(controllers):
+            controller.last_index = chosen_indices[i]
+            controller.last_mag = highest_mags[i]
+            if chosen_vels[i] != None:
+                linear[i] = 0.1 * chosen_vels[i][0]
+                angular[i] = 0.02 * chosen_vels[i][1]
+        return linear, angular
+
+def obstacle_vertices(shape, circle_vertices):
+    """ Return the vertices, in counterclockwise order, of a polygon covering
+    the given Segment or Circle shape (in world coordinates), or None for
+    other shapes. """
+    body = shape.body
+    if isinstance(shape, Segment):
+        (ax, ay) = body.local_to_world(shape.a)
+        (bx, by) = body.local_to_world(shape.b)
+        r = shape.radius
+        length = sqrt((bx - ax)**2 + (by - ay)**2)
+        if length == 0:
+            (dx, dy) = (r, 0)
+        else:
+            (dx, dy) = (r * (bx - ax) / length, r * (by - ay) / length)
+
+        # A rectangle around the segment, thickened by its radius.
+        return [(ax - dx + dy, ay - dy - dx), (bx + dx + dy, by + dy - dx),
+                (bx + dx - dy, by + dy + dx), (ax - dx - dy, ay - dy + dx)]
+    elif isinstance(shape, Circle):
+        (cx, cy) = body.local_to_world(shape.offset)
+        r = shape.radius / cos(pi / circle_vertices)
+        return [(cx + r * cos(2*pi * i / circle_vertices),
+                 cy + r * sin(2*pi * i / circle_vertices))
+                for i in range(circle_vertices)]
+    return None
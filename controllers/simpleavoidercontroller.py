@@ -1,8 +1,11 @@
+import numpy as np
 from controller import Controller
 from common import Twist, M_TO_PIXELS
 
 class SimpleAvoiderController(Controller):
 
+    sensors = ["range_scan"]
+
     def react(self, robot, sensor_suite, visualize=False):
 
         range_scan = sensor_suite.range_scan
@@ -24,4 +27,21 @@ class SimpleAvoiderController(Controller):
                 twist.angular = -1 / range_scan.angles[closestI]
                 
         return twist
-        
+
+    def react_batch(self, robots, scans):
+        """ The same as react() for every robot at once. """
+        range_scan = scans["range_scan"]
+        angles = range_scan.geometry.angle_array
+
+        # Turn away from the closest thing within range, if any.
+        ranges = range_scan.ranges
+        seen = ranges < range_scan.geometry.RANGE_MAX
+        closest = np.argmin(np.where(seen, ranges, np.inf), axis=1)
+        closest_angles = angles[closest]
+        turn = seen.any(axis=1) & (closest_angles != 0)
+
+        linear = np.empty(len(robots))
+        linear.fill(4)
+        angular = np.zeros(len(robots))
+        angular[turn] = -1 / closest_angles[turn]
+        return linear, angular
@@ -5,6 +5,9 @@ from common import *
 from common.drawing import draw_circle
 
 class Landmark(object):
+    __slots__ = ("body", "shape", "mask", "vis_range_max",
+                 "vis_inside_radius", "vis_outside_radius")
+
     def __init__(self, mask, radius):
         self.body = Body(0, 0, Body.STATIC)
         self.body.position = 0, 0
@@ -2,14 +2,8 @@
 
 import sys, os, shutil, math
 from math import pi
-from colorama import init, Fore, Style
 from configsingleton import ConfigSingleton
-
-def execute(cmd):
-    # Print the command to execute in green
-    print(Fore.GREEN + cmd)
-    print(Style.RESET_ALL)
-    os.system(cmd)
+from trialrunner import run_trials, save_results
 
 config = ConfigSingleton.get_instance('default.cfg')
 
@@ -35,6 +29,14 @@ os.mkdir(output_dir)
 
 number_trials = 3
 
+# Trials are run headless, so they need a fixed length.
+number_steps = 5000
+config.set("AlvinSim", "number_steps", number_steps)
+
+# Number of worker processes (None means one per core).
+number_processes = None
+
+jobs = []
 for nr in number_robots: 
     #config.set("GauciController", "linear_speed", l)
     #config.set("GauciController", "angular_speed", a)
@@ -47,5 +49,8 @@ for nr in number_robots:
     config.write(open(filename, 'w'))
 
     for trial in range(number_trials):
-        execute("alvin.py {} {}".format(filename, trial))
+        jobs.append((filename, trial))
+
+results = run_trials(jobs, number_processes)
+save_results(results)
 
@@ -0,0 +1,181 @@
+""" A uniform grid over the arena which records the discs, (thick) wall
+segments and polygons placed so far.  It is used while building a world to find random
+non-overlapping positions for new objects.  Rather than rejection sampling
+against the whole arena, candidates are drawn from the cells still believed to
+have room, and cells are dropped as they fill up, so placement stays fast even
+for thousands of objects.  All randomness comes from the 'random' module, so
+placement is reproducible for a given seed. """
+
+from math import sqrt
+from random import randrange, uniform
+
+def point_segment_distance(px, py, x1, y1, x2, y2):
+    dx = x2 - x1
+    dy = y2 - y1
+    length_sq = dx*dx + dy*dy
+    if length_sq == 0:
+        t = 0
+    else:
+        t = ((px - x1)*dx + (py - y1)*dy) / float(length_sq)
+        t = max(0, min(1, t))
+    ex = px - (x1 + t*dx)
+    ey = py - (y1 + t*dy)
+    return sqrt(ex*ex + ey*ey)
+
+def point_obstacle_distance(px, py, points):
+    """ Distance from (px, py) to a point, a segment or a convex polygon
+    (vertices in counter-clockwise order), given as a list of vertices.  Zero
+    if the point is inside the polygon. """
+
+    n = len(points)
+    if n == 1:
+        (x, y) = points[0]
+        return sqrt((px - x)*(px - x) + (py - y)*(py - y))
+    if n == 2:
+        return point_segment_distance(px, py, points[0][0], points[0][1],
+                                      points[1][0], points[1][1])
+
+    inside = True
+    distance = float('inf')
+    for i in range(n):
+        (x1, y1) = points[i]
+        (x2, y2) = points[(i + 1) % n]
+        if (x2 - x1)*(py - y1) - (y2 - y1)*(px - x1) < 0:
+            inside = False
+        distance = min(distance,
+                       point_segment_distance(px, py, x1, y1, x2, y2))
+    if inside:
+        return 0
+    return distance
+
+class PlacementGrid(object):
+
+    # After this many failed attempts within an open square, the square is
+    # split into four.  Squares which can't be split any further are dropped.
+    MAX_FAILURES = 8
+
+    # Open squares are never split below this fraction of a cell.
+    MIN_SQUARE_FRACTION = 1 / 32.0
+
+    def __init__(self, width, height, cell_size):
+        self.width = width
+        self.height = height
+        self.cell_size = float(cell_size)
+        self.number_columns = int(width / self.cell_size) + 1
+        self.number_rows = int(height / self.cell_size) + 1
+
+        # Maps (column, row) to a list of obstacles, where an obstacle is a
+        # tuple (points, radius).  Discs have one point, segments two and
+        # polygons three or more.
+        self.cells = {}
+
+        # Squares (x, y, side, failures) which may still have room, keyed by
+        # the (radius, offset) of the objects being placed.
+        self.open_squares = {}
+
+    def cell_span(self, xmin, ymin, xmax, ymax):
+        """ Return the (column, row) of every cell overlapping the given box. """
+        c1 = max(0, int(xmin / self.cell_size))
+        r1 = max(0, int(ymin / self.cell_size))
+        c2 = min(self.number_columns - 1, int(xmax / self.cell_size))
+        r2 = min(self.number_rows - 1, int(ymax / self.cell_size))
+        return [(c, r) for c in range(c1, c2 + 1) for r in range(r1, r2 + 1)]
+
+    def add_disc(self, x, y, radius):
+        self.add_obstacle([(x, y)], radius)
+
+    def add_segment(self, x1, y1, x2, y2, radius):
+        self.add_obstacle([(x1, y1), (x2, y2)], radius)
+
+    def add_polygon(self, vertices, radius=0):
+        self.add_obstacle([(v[0], v[1]) for v in vertices], radius)
+
+    def add_obstacle(self, points, radius):
+        obstacle = (points, radius)
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        for cell in self.cell_span(min(xs) - radius, min(ys) - radius,
+                                   max(xs) + radius, max(ys) + radius):
+            self.cells.setdefault(cell, []).append(obstacle)
+
+    def find_blocking_obstacle(self, x, y, radius):
+        """ Return an obstacle overlapping the disc of the given radius centred
+        on (x, y), or None if the disc is free.  Any overlap lies in a cell
+        that both the disc and the obstacle were registered in, so only the
+        cells under the disc need to be checked. """
+
+        for cell in self.cell_span(x - radius, y - radius,
+                                   x + radius, y + radius):
+            for obstacle in self.cells.get(cell, ()):
+                (points, obstacle_radius) = obstacle
+                if (point_obstacle_distance(x, y, points) <
+                    radius + obstacle_radius):
+                    return obstacle
+        return None
+
+    def place(self, radius, offset):
+        """ Return a random position (x, y) within 'offset' of the arena's
+        edges where a disc of the given radius overlaps nothing placed so far,
+        or None if no room could be found.  The caller should add whatever it
+        places. """
+
+        xmin, ymin = offset, offset
+        xmax, ymax = self.width - offset, self.height - offset
+
+        key = (radius, offset)
+        if key not in self.open_squares:
+            self.open_squares[key] = [(c * self.cell_size, r * self.cell_size,
+                                       self.cell_size, 0) for (c, r) in
+                                      self.cell_span(xmin, ymin, xmax, ymax)]
+        open_squares = self.open_squares[key]
+        min_side = self.cell_size * self.MIN_SQUARE_FRACTION
+
+        while len(open_squares) > 0:
+            index = randrange(len(open_squares))
+            (sx, sy, side, failures) = open_squares[index]
+
+            # Sample within the part of the square inside the allowed region.
+            x = uniform(max(xmin, sx), min(xmax, sx + side))
+            y = uniform(max(ymin, sy), min(ymax, sy + side))
+
+            obstacle = self.find_blocking_obstacle(x, y, radius)
+            if obstacle == None:
+                return x, y
+
+            # Drop the square if the blocking obstacle covers all of it.
+            # Otherwise, after repeated failures, replace it with its four
+            # quarters so that sampling concentrates on whatever room is left.
+            (points, obstacle_radius) = obstacle
+            half = side / 2.0
+            covered = (point_obstacle_distance(sx + half, sy + half, points)
+                       + half * sqrt(2) <= radius + obstacle_radius)
+            open_squares[index] = open_squares[-1]
+            open_squares.pop()
+            if covered:
+                continue
+            if failures < self.MAX_FAILURES:
+                open_squares.append((sx, sy, side, failures + 1))
+            elif half >= min_side:
+                for (qx, qy) in [(sx, sy), (sx + half, sy),
+                                 (sx, sy + half), (sx + half, sy + half)]:
+                    if (qx <= xmax and qy <= ymax and
+                        qx + half >= xmin and qy + half >= ymin):
+                        open_squares.append((qx, qy, half, 0))
+
+        return None
+
+    def sample(self, radius, offset, attempts, fits=None):
+        """ Like place(), but draws up to 'attempts' candidates uniformly from
+        the whole allowed region, so it is slow but never writes off room that
+        place() has dropped.  If given, 'fits(x, y)' replaces the test of the
+        disc, so that a caller can test the exact shape the disc bounds. """
+
+        for i in range(attempts):
+            x = uniform(offset, self.width - offset)
+            y = uniform(offset, self.height - offset)
+            if fits == None:
+                if self.find_blocking_obstacle(x, y, radius) == None:
+                    return x, y
+            elif fits(x, y):
+                return x, y
+        return None
@@ -1,12 +1,16 @@
 """ A probe just sits in space and processes sensor data---but unlike a robot,
 it does not move. """
 
+import pyglet
+import numpy as np
 from pymunk import Body, moment_for_circle
-from math import cos, sin, atan2, pi
+from math import pi
 from common import *
-from common.drawing import draw_line, draw_circle
 
 class Probe(object):
+    # The scanners are given to each probe by the AlvinEngine.
+    __slots__ = ("body", "radius", "landmark_scanner", "range_scanner")
+
     def __init__(self):
         # We'll have a body, just to have a way of representing its position
         # and treating it similarly to a robot (where convenient).
@@ -18,45 +22,118 @@ class Probe(object):
 
         self.radius = 0
 
-    def get_lmark_dist_angle_mask(self, lscan):
-        """ Return a tuple (distance, angle, mask) of the closest landmark. """
-    
-        closest_distance = float('inf')
-        closest_angle = None
-        closest_mask = None
-        closest_index = None
-        for i in range(len(lscan.ranges)):
-            if (lscan.masks[i] & ANY_LANDMARK_MASK != 0
-               and lscan.ranges[i] < closest_distance):
-                closest_distance = lscan.ranges[i]
-                closest_angle = lscan.angles[i]
-                closest_mask = lscan.masks[i]
-                closest_index = i
-        if closest_angle == None:
-            return (None, None, None)
-
-        return (closest_distance, closest_angle, closest_mask)
-
-    def react(self, lscan):
-
-        (cl_dist, cl_angle, cl_mask) = self.get_lmark_dist_angle_mask(lscan)
-
-        draw_circle(self.body.position, 2, (255, 255, 255))
-
-        if cl_angle != None and cl_dist > 0:
-            if cl_mask == ARC_LANDMARK_MASK:
-                draw_line(self, lscan, cl_angle, (0, 255, 0), 20, 1)
-            elif cl_mask == BLAST_LANDMARK_MASK:
-                draw_line(self, lscan, cl_angle+pi, (255, 0, 0), 20, 1)
-            elif (cl_mask == POLE_LANDMARK_MASK):
-
-                # We'll average all pole landmark responses.
-                vx = 0
-                vy = 0
-                for i in range(len(lscan.ranges)):
-                    if (lscan.masks[i] & POLE_LANDMARK_MASK != 0):
-                        vx += cos(lscan.angles[i])
-                        vy += sin(lscan.angles[i])
-                combined_angle = atan2(vy, vx)
-                
-                draw_line(self, lscan, combined_angle, (0, 0, 255), 20, 1)
+class ProbeField(object):
+    """ The responses of a whole grid of probes, computed from one batch of
+    landmark scans and drawn as a single pyglet Batch.  Each probe responds
+    to the closest landmark it sees: it points towards an arc landmark, away
+    from a blast landmark, and towards the average of all the pole landmarks
+    it sees if the closest is a pole.  Probes sense only static shapes, so
+    the field is kept until those change (see StaticOccluders.invalidate).
+    """
+
+    # Length of each probe's line, and the radius and number of points of
+    # the circle marking each probe.
+    LINE_LENGTH = 20
+    CIRCLE_RADIUS = 2
+    CIRCLE_POINTS = 50
+
+    COLOURS = {ARC_LANDMARK_MASK: (0, 255, 0),
+               BLAST_LANDMARK_MASK: (255, 0, 0),
+               POLE_LANDMARK_MASK: (0, 0, 255)}
+
+    def __init__(self, probes, static_occluders):
+        self.probes = probes
+        self.static_occluders = static_occluders
+        self.scanner = probes[0].landmark_scanner
+
+        # The StaticOccluders version for which the field was computed.
+        self.version = None
+        self.scans = None
+        self.batch = None
+
+    def compute(self, env):
+        """ Return (angles, masks): for each probe the angle of its response
+        and the mask of the closest landmark which determines it (0 for
+        probes with no response). """
+
+        self.scans = self.scanner.compute_batch(env, self.probes)
+        ranges = self.scans.ranges
+        masks = self.scans.masks
+        angles = np.array(self.scanner.geometry.angles)
+        rows = np.arange(len(self.probes))
+
+        # The closest landmark seen by each probe.
+        distances = np.where(masks & ANY_LANDMARK_MASK != 0, ranges, np.inf)
+        closest = np.argmin(distances, axis=1)
+        closest_distances = distances[rows, closest]
+        closest_masks = masks[rows, closest]
+        closest_masks[~(closest_distances > 0) |
+                      np.isinf(closest_distances)] = 0
+
+        # Flee blast landmarks and head for the average of all pole ones.
+        responses = angles[closest]
+        blast = closest_masks == BLAST_LANDMARK_MASK
+        responses[blast] += pi
+        poles = masks & POLE_LANDMARK_MASK != 0
+        pole_angles = np.arctan2((poles * np.sin(angles)).sum(axis=1),
+                                 (poles * np.cos(angles)).sum(axis=1))
+        pole = closest_masks == POLE_LANDMARK_MASK
+        responses[pole] = pole_angles[pole]
+
+        known = np.zeros(len(self.probes), dtype=bool)
+        for mask in self.COLOURS:
+            known |= closest_masks == mask
+        closest_masks[~known] = 0
+        return responses, closest_masks
+
+    def build_batch(self, angles, masks):
+        """ Return a pyglet Batch with every probe's circle and line. """
+        batch = pyglet.graphics.Batch()
+        xs = np.array([probe.body.position.x for probe in self.probes])
+        ys = np.array([probe.body.position.y for probe in self.probes])
+
+        # Each circle is a loop of line segments.
+        circle = np.linspace(0, 2*pi, self.CIRCLE_POINTS, endpoint=False)
+        circle = np.stack([circle, np.roll(circle, -1)], axis=1).ravel()
+        circle_xs = xs[:,None] + self.CIRCLE_RADIUS * np.cos(circle)
+        circle_ys = ys[:,None] + self.CIRCLE_RADIUS * np.sin(circle)
+        vertices = np.stack([circle_xs.ravel(), circle_ys.ravel()], axis=1)
+        batch.add(len(vertices), pyglet.gl.GL_LINES, None,
+                  ('v2f', vertices.ravel().tolist()),
+                  ('c3B', (255, 255, 255) * len(vertices)))
+
+        # Lines are drawn as draw_line() would draw them.
+        shown = masks != 0
+        if shown.any():
+            inner = self.probes[0].radius + self.scanner.geometry.RANGE_MIN
+            headings = np.array([probe.body.angle for probe in self.probes])
+            directions = headings[shown] + angles[shown]
+            c = np.cos(directions)
+            s = np.sin(directions)
+            x1 = np.trunc(xs[shown] + inner * c)
+            y1 = np.trunc(ys[shown] + inner * s)
+            x2 = np.trunc(xs[shown] + (inner + self.LINE_LENGTH) * c)
+            y2 = np.trunc(ys[shown] + (inner + self.LINE_LENGTH) * s)
+            vertices = np.stack([x1, y1, x2, y2], axis=1).ravel()
+            colours = []
+            for mask in masks[shown]:
+                colours.extend(self.COLOURS[mask] * 2)
+            batch.add(2 * shown.sum(), pyglet.gl.GL_LINES, None,
+                      ('v2f', vertices.tolist()), ('c3B', colours))
+        return batch
+
+    def draw(self, env, visualize_scans=False):
+        """ Draw the field, computing it again only if the static shapes have
+        changed (or if the probes can also see dynamic ones).  If
+        'visualize_scans' is set each probe's landmark scan is drawn too. """
+        if (self.batch == None or
+            self.version != self.static_occluders.version or
+            self.static_occluders.dynamic_mask(self.scanner.detection_mask)):
+            self.version = self.static_occluders.version
+            angles, masks = self.compute(env)
+            self.batch = self.build_batch(angles, masks)
+
+        self.batch.draw()
+        if visualize_scans:
+            for i, probe in enumerate(self.probes):
+                self.scanner.draw(probe, self.scans.scan(i))
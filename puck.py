@@ -2,6 +2,9 @@ from pymunk import Body, Circle, moment_for_circle, ShapeFilter
 from common import Twist, RED_PUCK_MASK, GREEN_PUCK_MASK, BLUE_PUCK_MASK, M_TO_PIXELS
 
 class Puck(object):
+    # Large arenas hold thousands of pucks, so they have no __dict__.
+    __slots__ = ("immobile", "mass", "radius", "body", "shape", "kind")
+
     def __init__(self, kind, immobile=False):
         self.immobile = immobile
         self.mass = 0.1  # 0.1 kg
@@ -4,6 +4,17 @@ from common import Twist, ROBOT_MASK, M_TO_PIXELS
 from common.angles import normalize_angle_0_2pi
 
 class Robot(object):
+    __slots__ = ("mass", "radius", "body", "shape", "command",
+                 # Given to each robot by the AlvinEngine.
+                 "controller", "range_scanner", "landmark_scanner",
+                 "puck_scanner", "robot_scanner", "sensor_suite",
+                 "scan_buffers")
+
+    # The interval (s) at which an impulse of 'command.linear' is applied,
+    # i.e. the rate at which commands were applied before the physics could
+    # be substepped.
+    IMPULSE_INTERVAL = 1.0 / 120
+
     def __init__(self):
         self.mass = 1  # 1 kg
 
@@ -68,7 +79,10 @@ class Robot(object):
 
         self.body.angular_velocity = self.command.angular
 
-        self.body.apply_impulse_at_local_point((self.command.linear, 0), (0,0))
+        # The impulse is scaled so that the robot is pushed just as hard per
+        # second however often control_step is called.
+        impulse = self.command.linear * dt / self.IMPULSE_INTERVAL
+        self.body.apply_impulse_at_local_point((impulse, 0), (0,0))
 
     def set_command(self, twist):
         """Set robot velocity command.
@@ -1,4 +1,7 @@
-from rangescanner import RangeScan, RangeScanner
+from rangescanner import ScanGeometry, RangeScan, BatchScan, RangeScanner
+from occluders import StaticOccluders
+from objectgrid import ObjectGrid
+from scanruns import ScanRuns
 from puckscanner import DetectedPuck, PuckScan, PuckScanner
 from robotscanner import DetectedRobot, RobotScan, RobotScanner
 from landmarkscanner import DetectedLandmark, LandmarkScan, LandmarkScanner
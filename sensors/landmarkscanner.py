@@ -5,13 +5,26 @@ from math import pi, sqrt, atan2
 from common.angles import normalize_angle_pm_pi
 from configsingleton import ConfigSingleton
 
-class DetectedLandmark:
+class DetectedLandmark(object):
+    __slots__ = ("distance", "angle")
+
     def __init__(self, distance, angle):
         self.distance = distance
         self.angle = angle
 
 class LandmarkScan:
     """ A landmark scan is a list of (range, angle) pairs, with associated constants. """
+    def __init__(self, scanner):
+
+        # The constants are read from the config by the scanner, once.
+        self.MIN_ANGLE = scanner.MIN_ANGLE
+        self.MAX_ANGLE = scanner.MAX_ANGLE
+        self.MIN_RANGE = scanner.MIN_RANGE
+        self.MAX_RANGE = scanner.MAX_RANGE
+
+        self.landmarks = []
+
+class LandmarkScanner:
     def __init__(self):
 
         config = ConfigSingleton.get_instance()
@@ -20,19 +33,21 @@ class LandmarkScan:
         self.MIN_RANGE = config.getfloat("LandmarkScan", "min_range")
         self.MAX_RANGE = config.getfloat("LandmarkScan", "max_range")
 
-        self.landmarks = []
-
-class LandmarkScanner:
-    def compute(self, env, robot, landmarks, visualize=False):
+    def compute(self, env, robot, landmark_grid, visualize=False):
         """ Returns a LandmarkScan taken from the given environment, robot, and 
-        list of landmarks. """
+        ObjectGrid of landmarks. """
 
-        scan = LandmarkScan()
+        scan = LandmarkScan(self)
 
         if visualize:
             pyglet.gl.glLineWidth(3)
 
-        for landmark in landmarks:
+        position = robot.body.position
+        for landmark in landmark_grid.objects_in_sector(position.x, position.y,
+                                                        robot.body.angle,
+                                                        scan.MIN_ANGLE,
+                                                        scan.MAX_ANGLE,
+                                                        scan.MAX_RANGE):
             dx = landmark.body.position.x - robot.body.position.x
             dy = landmark.body.position.y - robot.body.position.y
             distance = sqrt(dx*dx + dy*dy)
@@ -0,0 +1,109 @@
+""" The analytic scanners (pucks, robots and landmarks) only need the position
+of each object.  An ObjectGrid sorts those positions into the cells of a
+uniform grid once per step, so that a scan only has to look at the objects in
+the cells its field of view covers rather than at every object. """
+
+import numpy as np
+from math import pi, sqrt
+
+# The grid never has more than this many cells along either side, however far
+# an object has strayed from the arena.
+MAX_CELLS_PER_SIDE = 256
+
+class ObjectGrid(object):
+
+    def __init__(self, objects, width, height, cell_size):
+        """ 'objects' is the list of things to index (anything with a body).
+        The grid covers the arena of the given width and height. """
+        self.objects = objects
+        self.width = width
+        self.height = height
+        self.min_cell_size = float(cell_size)
+        self.update()
+
+    def update(self):
+        """ Read the current positions of the objects and sort them into the
+        cells.  Must be called whenever the objects have moved (i.e. once per
+        step) and before any query. """
+
+        n = len(self.objects)
+        positions = [thing.body.position for thing in self.objects]
+        positions = np.array([(p.x, p.y) for p in positions], dtype=float)
+        positions = positions.reshape(n, 2)
+        xs = positions[:,0]
+        ys = positions[:,1]
+
+        # Cover the arena and anything which has somehow left it.
+        self.min_x = min(0.0, xs.min()) if n > 0 else 0.0
+        self.min_y = min(0.0, ys.min()) if n > 0 else 0.0
+        max_x = max(float(self.width), xs.max()) if n > 0 else self.width
+        max_y = max(float(self.height), ys.max()) if n > 0 else self.height
+        self.cell_size = max(self.min_cell_size,
+                             (max_x - self.min_x) / MAX_CELLS_PER_SIDE,
+                             (max_y - self.min_y) / MAX_CELLS_PER_SIDE)
+        self.number_columns = int((max_x - self.min_x) / self.cell_size) + 1
+        self.number_rows = int((max_y - self.min_y) / self.cell_size) + 1
+
+        columns = ((xs - self.min_x) / self.cell_size).astype(int)
+        rows = ((ys - self.min_y) / self.cell_size).astype(int)
+        columns = np.minimum(columns, self.number_columns - 1)
+        rows = np.minimum(rows, self.number_rows - 1)
+        cells = rows * self.number_columns + columns
+
+        # The indices of the objects in cell c are
+        # order[cell_starts[c]:cell_ends[c]].
+        self.order = np.argsort(cells, kind='mergesort')
+        counts = np.bincount(cells,
+                        minlength=self.number_columns * self.number_rows)
+        self.cell_ends = np.cumsum(counts)
+        self.cell_starts = self.cell_ends - counts
+
+    def objects_in_sector(self, x, y, heading, min_angle, max_angle,
+                          max_range):
+        """ Return the objects, in the order of the original list, lying in
+        cells which may overlap the sector of radius 'max_range' about (x, y)
+        spanning the angles [min_angle, max_angle] relative to 'heading'.
+        This is a superset of the objects within the sector, so the caller
+        still has to make the exact test. """
+
+        # The cells overlapping the bounding box of the whole disc...
+        first_column = max(int((x - max_range - self.min_x) / self.cell_size),
+                           0)
+        last_column = min(int((x + max_range - self.min_x) / self.cell_size),
+                          self.number_columns - 1)
+        first_row = max(int((y - max_range - self.min_y) / self.cell_size), 0)
+        last_row = min(int((y + max_range - self.min_y) / self.cell_size),
+                       self.number_rows - 1)
+        if first_column > last_column or first_row > last_row:
+            return []
+        columns, rows = np.meshgrid(np.arange(first_column, last_column + 1),
+                                    np.arange(first_row, last_row + 1))
+        columns = columns.ravel()
+        rows = rows.ravel()
+
+        # ...less those whose bounding circle misses the sector.
+        half_diagonal = self.cell_size * sqrt(0.5)
+        dx = self.min_x + (columns + 0.5) * self.cell_size - x
+        dy = self.min_y + (rows + 0.5) * self.cell_size - y
+        distances = np.hypot(dx, dy)
+        near = distances <= max_range + half_diagonal
+        if max_angle - min_angle < 2*pi:
+            centre = heading + 0.5 * (min_angle + max_angle)
+            offsets = np.abs((np.arctan2(dy, dx) - centre + pi) % (2*pi) - pi)
+            with np.errstate(divide='ignore'):
+                spreads = np.arcsin(np.minimum(half_diagonal / distances, 1))
+            near &= ((offsets <= 0.5 * (max_angle - min_angle) + spreads) |
+                     (distances <= half_diagonal))
+        cells = (rows * self.number_columns + columns)[near]
+
+        starts = self.cell_starts[cells]
+        counts = self.cell_ends[cells] - starts
+        total = counts.sum()
+        if total == 0:
+            return []
+
+        # The positions self.order[starts[k]], ..., self.order[starts[k] +
+        # counts[k] - 1] of every selected cell k, in one array.
+        offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        indices = np.sort(self.order[offsets + np.arange(total)])
+        return [self.objects[i] for i in indices]
@@ -0,0 +1,61 @@
+""" The static shapes of a world (walls, landmarks and immobile pucks) never
+move on their own, so their geometry is extracted once and kept as NumPy
+arrays for the range scanners.  Only the dynamic shapes (robots and pucks)
+then need to be looked up in the Space for each scan.  Whatever moves a static
+body (e.g. dragging a landmark with the mouse) must call invalidate(). """
+
+from pymunk import Body
+from raycaster import ShapeArrays
+
+class StaticOccluders(object):
+
+    def __init__(self, env):
+        self.env = env
+
+        # Incremented by every invalidate(), so that anything derived from
+        # the static shapes can tell whether it is out of date.
+        self.version = 0
+        self.invalidate()
+
+    def invalidate(self):
+        """ Forget the static shapes, to be found again when next needed. """
+        self.version += 1
+        self.static_shapes = None
+        self.dynamic_categories = 0
+
+        # ShapeArrays of the static shapes, keyed by detection mask.
+        self.arrays = {}
+
+    def find_shapes(self):
+        self.static_shapes = []
+        self.dynamic_categories = 0
+        for shape in self.env.shapes:
+            if shape.sensor:
+                continue
+            if shape.body.body_type == Body.STATIC:
+                self.static_shapes.append(shape)
+            else:
+                self.dynamic_categories |= shape.filter.categories
+
+    def shapes(self):
+        """ Return the list of static shapes. """
+        if self.static_shapes == None:
+            self.find_shapes()
+        return self.static_shapes
+
+    def shapes_for(self, detection_mask):
+        """ Return the ShapeArrays of the static shapes which a query with the
+        given detection mask would accept. """
+        if detection_mask not in self.arrays:
+            self.arrays[detection_mask] = ShapeArrays(
+                [shape for shape in self.shapes()
+                 if shape.filter.categories & detection_mask != 0 and
+                    shape.filter.mask != 0])
+        return self.arrays[detection_mask]
+
+    def dynamic_mask(self, detection_mask):
+        """ The part of the detection mask which may match dynamic shapes, or
+        0 if only static shapes can be detected. """
+        if self.static_shapes == None:
+            self.find_shapes()
+        return detection_mask & self.dynamic_categories
@@ -5,7 +5,9 @@ from math import pi, sqrt, atan2
 from pymunk import ShapeFilter
 from common.angles import normalize_angle_pm_pi
 
-class DetectedPuck:
+class DetectedPuck(object):
+    __slots__ = ("distance", "angle", "kind")
+
     def __init__(self, distance, angle, kind):
         self.distance = distance
         self.angle = angle
@@ -24,16 +26,20 @@ class PuckScan:
         self.pucks = []
 
 class PuckScanner:
-    def compute(self, env, robot, pucks, visualize=False):
+    def compute(self, env, robot, puck_grid, visualize=False):
         """ Returns a PuckScan taken from the given environment, robot, and 
-        list of pucks. """
+        ObjectGrid of pucks. """
 
         scan = PuckScan()
 
         if visualize:
             pyglet.gl.glLineWidth(3)
 
-        for puck in pucks:
+        position = robot.body.position
+        for puck in puck_grid.objects_in_sector(position.x, position.y,
+                                                robot.body.angle,
+                                                scan.MIN_ANGLE, scan.MAX_ANGLE,
+                                                scan.MAX_RANGE):
             dx = puck.body.position.x - robot.body.position.x
             dy = puck.body.position.y - robot.body.position.y
             distance = sqrt(dx*dx + dy*dy)
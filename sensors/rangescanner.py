@@ -1,16 +1,27 @@
 """ A RangeScanner emulates a laser scanner and senses walls, other robots, but not pucks. """
 
-import pyglet
+import pyglet, sys
+import numpy as np
 from math import pi, cos, sin
-from pymunk import ShapeFilter
+from pymunk import BB, Body, ShapeFilter
 from common import *
+from raycaster import ShapeArrays, cast_rays, zbuffer_rays, pairs_from_ranges
+from scanruns import ScanRuns
 
 from configsingleton import ConfigSingleton
 
-class RangeScan:
-    """ A scan consists of a predfined list of angles, computed lists of ranges and masks, as well as associated constants. """
+# Each ray is a segment query of this thickness.
+RAY_RADIUS = 1
+
+ALGORITHMS = ["segment_query", "numpy", "zbuffer"]
 
-    def __init__(self, config_section, robot):
+class ScanGeometry:
+    """ The parameters of a range scan config section, together with the ray
+    angles, their unit direction vectors (relative to the robot's heading) and
+    the shape filter.  Computed once per RangeScanner and shared by all of its
+    scans. """
+
+    def __init__(self, config_section, detection_mask):
 
         config = ConfigSingleton.get_instance()
         self.NUMBER_POINTS = config.getint(config_section, "number_points")
@@ -18,15 +29,55 @@ class RangeScan:
         self.ANGLE_MAX = config.getfloat(config_section, "angle_max")
         self.RANGE_MIN = config.getfloat(config_section, "range_min")
         self.RANGE_MAX = config.getfloat(config_section, "range_max")
+        self.ALGORITHM = config.get(config_section, "algorithm")
+        if self.ALGORITHM not in ALGORITHMS:
+            sys.exit("Unknown algorithm in [{}]: {}".format(config_section,
+                                                            self.ALGORITHM))
+        self.ADAPTIVE_STEP = config.getint(config_section, "adaptive_step")
+        self.ADAPTIVE_TOLERANCE = config.getfloat(config_section,
+                                                  "adaptive_tolerance")
+        if self.ADAPTIVE_STEP < 1:
+            sys.exit("adaptive_step in [{}] must be at least 1".format(
+                     config_section))
+        if self.ADAPTIVE_STEP > 1 and self.ALGORITHM != "segment_query":
+            sys.exit("adaptive_step in [{}] needs the 'segment_query' "
+                     "algorithm".format(config_section))
+        self.REUSE_SCANS = config.getboolean(config_section, "reuse_scans")
+        self.REUSE_DISTANCE = config.getfloat(config_section, "reuse_distance")
+        self.REUSE_ANGLE = config.getfloat(config_section, "reuse_angle")
 
         self.angles = []
+        self.angle_delta = 0
         if self.NUMBER_POINTS == 1:
             self.angles.append(self.ANGLE_MIN)
         else:
-            angle_delta = (self.ANGLE_MAX - self.ANGLE_MIN) / \
-                          (self.NUMBER_POINTS - 1)
+            self.angle_delta = (self.ANGLE_MAX - self.ANGLE_MIN) / \
+                               (self.NUMBER_POINTS - 1)
             for i in range(self.NUMBER_POINTS):
-                self.angles.append(self.ANGLE_MIN + i * angle_delta)
+                self.angles.append(self.ANGLE_MIN + i * self.angle_delta)
+
+        self.cosines = [cos(angle) for angle in self.angles]
+        self.sines = [sin(angle) for angle in self.angles]
+        self.angle_array = np.array(self.angles)
+        self.cosine_array = np.array(self.cosines)
+        self.sine_array = np.array(self.sines)
+
+        self.shape_filter = ShapeFilter(mask=detection_mask)
+
+class RangeScan:
+    """ A scan consists of a predfined list of angles, computed lists of ranges and masks, as well as associated constants. """
+
+    def __init__(self, geometry, robot):
+
+        self.NUMBER_POINTS = geometry.NUMBER_POINTS
+        self.ANGLE_MIN = geometry.ANGLE_MIN
+        self.ANGLE_MAX = geometry.ANGLE_MAX
+        self.RANGE_MIN = geometry.RANGE_MIN
+        self.RANGE_MAX = geometry.RANGE_MAX
+
+        # Shared with all other scans from the same scanner.
+        self.angles = geometry.angles
+        self.angle_array = geometry.angle_array
 
         self.ranges = []
         self.masks = []
@@ -35,8 +86,111 @@ class RangeScan:
         self.INNER_RADIUS = robot.radius + self.RANGE_MIN
         self.OUTER_RADIUS = self.INNER_RADIUS + self.RANGE_MAX
 
+        # The ranges and masks as arrays, and the features found so far,
+        # keyed by the name and arguments of the method which found them.
+        # Both are filled in on demand, once the scan is complete.
+        self.range_array = None
+        self.mask_array = None
+        self.features = {}
+
+    def arrays(self):
+        """ Return the ranges and masks as NumPy arrays. """
+        if self.range_array is None:
+            self.range_array = np.array(self.ranges, dtype=float)
+            self.mask_array = np.array(self.masks, dtype=int)
+        return self.range_array, self.mask_array
+
+    def closest(self, mask):
+        """ Return (distance, angle, mask) for the closest ray which hit
+        something matching 'mask' (the first, if several are equally close),
+        or (None, None, None) if none did. """
+        key = ("closest", mask)
+        if key not in self.features:
+            i = self.runs().closest(mask)
+            if i == None:
+                self.features[key] = (None, None, None)
+            else:
+                self.features[key] = (self.ranges[i], self.angles[i],
+                                      self.masks[i])
+        return self.features[key]
+
+    def runs(self):
+        """ Return the ScanRuns indexing the runs of equal masks. """
+        if "runs" not in self.features:
+            self.features["runs"] = ScanRuns(self)
+        return self.features["runs"]
+
+    def leftmost(self, mask):
+        """ Return the index of the leftmost (highest-index) ray which hit
+        something matching 'mask', or None. """
+        key = ("leftmost", mask)
+        if key not in self.features:
+            self.features[key] = self.runs().leftmost(mask)
+        return self.features[key]
+
+    def in_front(self, mask, threshold, centre_angle=0):
+        """ Return True if a ray within 'threshold' of -centre_angle hit
+        something matching 'mask'. """
+        key = ("in_front", mask, threshold, centre_angle)
+        if key not in self.features:
+            masks = self.arrays()[1]
+            front = np.abs(self.angle_array + centre_angle) < threshold
+            self.features[key] = bool((masks[front] & mask).any())
+        return self.features[key]
+
+    def centroid(self, mask, weighted=True):
+        """ Return (cx, cy, found), the sum of the unit vectors towards
+        the rays within pi/2 of straight ahead which hit something matching
+        'mask', divided by the number of rays.  If 'weighted' each vector is
+        scaled by 1/(1 + range), so that close things count most.  'found'
+        tells whether any ray contributed.  Ray angles are those given by
+        Controller.index_to_angle(). """
+        key = ("centroid", mask, weighted)
+        if key not in self.features:
+            # The angles increase (or decrease) along the scan, so the rays
+            # ahead are consecutive.
+            n = len(self.ranges)
+            ahead = np.flatnonzero((self.angle_array < pi/2) &
+                                   (self.angle_array >= -pi/2))
+            if len(ahead) == 0:
+                self.features[key] = (0.0, 0.0, False)
+            else:
+                (cx, cy, found) = self.runs().masked_vector_sum(
+                                      mask, ahead[0], ahead[-1], weighted)
+                self.features[key] = (cx / n, cy / n, found)
+        return self.features[key]
+
+class BatchScan:
+    """ The scans taken by one RangeScanner from many robots at once.
+    'ranges' and 'masks' are arrays with one row of NUMBER_POINTS entries per
+    robot, in the order the robots were given. """
+
+    def __init__(self, geometry, robots, ranges, masks):
+        self.geometry = geometry
+        self.robots = robots
+        self.ranges = ranges
+        self.masks = masks
+
+    def __len__(self):
+        return len(self.robots)
+
+    def scan(self, i, scan=None):
+        """ Returns the scan from the i-th robot as a RangeScan.  If 'scan'
+        (an earlier RangeScan by the same scanner from the same robot) is
+        given it is refilled and returned instead of a new one. """
+        if scan == None:
+            scan = RangeScan(self.geometry, self.robots[i])
+        else:
+            scan.features.clear()
+        scan.ranges = self.ranges[i].tolist()
+        scan.masks = self.masks[i].tolist()
+        scan.range_array = self.ranges[i]
+        scan.mask_array = self.masks[i]
+        return scan
+
 class RangeScanner:
-    def __init__(self, range_scan_sec_name, detection_mask, acceptance_mask):
+    def __init__(self, range_scan_sec_name, detection_mask, acceptance_mask,
+                 static_occluders=None):
         # The detection mask is used to indicate all types of objects that
         # the sensor should be sensitive to.  However, if a detected object
         # doesn't also match the acceptance mask then it will be treated as
@@ -45,80 +199,524 @@ class RangeScanner:
         self.acceptance_mask = acceptance_mask
 
         self.range_scan_sec_name = range_scan_sec_name
+        self.geometry = ScanGeometry(range_scan_sec_name, detection_mask)
+
+        # If given, the 'numpy' algorithm takes static shapes from this
+        # StaticOccluders rather than looking them up for every scan.
+        self.static_occluders = static_occluders
+
+        # If reuse_scans is set, the last scan cast from each robot (or
+        # probe), as a tuple (state, ranges, masks) where 'state' is as
+        # returned by scan_state.  It is reused for as long as that state
+        # stays close enough.
+        self.previous_scans = {}
+        self.scans_reused = 0
+        self.scans_cast = 0
 
     def compute(self, env, robot, visualize=False):
         """ Returns a Scan taken from the given environment and robot. """
-        scan = RangeScan(self.range_scan_sec_name, robot)
-
-        for sensor_angle in scan.angles:
-            c = cos(robot.body.angle + sensor_angle)
-            s = sin(robot.body.angle + sensor_angle)
-            x1 = int(robot.body.position.x + scan.INNER_RADIUS * c)
-            y1 = int(robot.body.position.y + scan.INNER_RADIUS * s)
-            x2 = int(robot.body.position.x + scan.OUTER_RADIUS * c)
-            y2 = int(robot.body.position.y + scan.OUTER_RADIUS * s)
-
-            #mask = ShapeFilter.ALL_MASKS ^ 2
-            shape_filter = ShapeFilter(mask=self.detection_mask)
-            query_info = env.segment_query_first((x1, y1), (x2, y2), 1, \
-                                                 shape_filter)
-            if query_info == None or query_info.shape == None:
-                scan.ranges.append(scan.RANGE_MAX)
-                scan.masks.append(0)
-
-                #if visualize:
-                #    pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
-                #                 ('v2f', (x1, y1, x2, y2)),
-                #                 ('c3B', (127, 127, 127, 127, 127, 127)))
+        scan = RangeScan(self.geometry, robot)
+        state = self.scan_state(env, robot)
+        if self.reusable(robot, state):
+            (old_state, ranges, masks) = self.previous_scans[robot]
+            scan.ranges = list(ranges)
+            scan.masks = list(masks)
+        else:
+            if self.geometry.ALGORITHM == "segment_query":
+                self.cast_segment_queries(env, robot, scan)
             else:
-                value = query_info.alpha * scan.RANGE_MAX
-                object_mask = query_info.shape.filter.categories
-                if object_mask & self.acceptance_mask == 0:
-                    # The detected shape is not accepted, we will treat
-                    # it as a wall.
-                    object_mask = WALL_MASK
-
-                scan.ranges.append(value)
-                scan.masks.append(object_mask)
-
-                if visualize:
-                    x2 = int(robot.body.position.x + \
-                             (scan.INNER_RADIUS + value) * c)
-                    y2 = int(robot.body.position.y + \
-                             (scan.INNER_RADIUS + value) * s)
-                    if object_mask == WALL_MASK:
-                        pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
-                                     ('v2f', (x1, y1, x2, y2)),
-                                     ('c3B', (255, 255, 0, 255, 255, 0)))
-                        #pass
-                    elif object_mask == ROBOT_MASK:
-                        pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
-                                     ('v2f', (x1, y1, x2, y2)),
-                                     ('c3B', (0, 255, 255, 0, 255, 255)))
-                    elif object_mask == BLAST_LANDMARK_MASK:
-                        pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
-                                     ('v2f', (x1, y1, x2, y2)),
-                                     ('c3B', (255, 100, 100, 255, 100, 100)))
-                    elif object_mask == POLE_LANDMARK_MASK:
-                        pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
-                                     ('v2f', (x1, y1, x2, y2)),
-                                     ('c3B', (100, 100, 255, 100, 100, 255)))
-                    elif object_mask == ARC_LANDMARK_MASK:
-                        pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
-                                     ('v2f', (x1, y1, x2, y2)),
-                                     ('c3B', (100, 255, 100, 100, 255, 100)))
-                    elif object_mask == RED_PUCK_MASK:
-                        pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
-                                     ('v2f', (x1, y1, x2, y2)),
-                                     ('c3B', (255, 0, 0, 255, 0, 0)))
-                    elif object_mask == GREEN_PUCK_MASK:
-                        pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
-                                     ('v2f', (x1, y1, x2, y2)),
-                                     ('c3B', (0, 255, 0, 0, 255, 0)))
-                    elif object_mask == BLUE_PUCK_MASK:
-                        pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
-                                     ('v2f', (x1, y1, x2, y2)),
-                                     ('c3B', (0, 0, 255, 0, 0, 255)))
-        
-        #print scan.masks
+                self.cast_numpy(env, robot, scan)
+            self.remember(robot, state, scan.ranges, scan.masks)
+
+        if visualize:
+            self.draw(robot, scan)
         return scan
+
+    def cast_segment_queries(self, env, robot, scan):
+        """ Fill in the scan with one segment query per ray, or only for some
+        of the rays if adaptive_step is above 1 (see cast_adaptive). """
+        pose = (robot.body.position.x, robot.body.position.y,
+                cos(robot.body.angle), sin(robot.body.angle))
+
+        if self.geometry.ADAPTIVE_STEP > 1:
+            self.cast_adaptive(env, scan, pose)
+            return
+
+        for i in range(self.geometry.NUMBER_POINTS):
+            (value, object_mask) = self.query_ray(env, scan, pose, i)
+            scan.ranges.append(value)
+            scan.masks.append(object_mask)
+
+    def cast_adaptive(self, env, scan, pose):
+        """ Fill in the scan by casting every ADAPTIVE_STEP-th ray, and the
+        last, first.  Between two cast rays whose hits differ in mask, or in
+        range by more than ADAPTIVE_TOLERANCE, the ray halfway between is
+        cast and each half is treated likewise.  The rays between two which
+        agree are filled in by interpolating their ranges, so an object
+        small enough to fit entirely between them can be missed. """
+        geometry = self.geometry
+        n = geometry.NUMBER_POINTS
+        scan.ranges = [None] * n
+        scan.masks = [None] * n
+
+        cast = range(0, n, geometry.ADAPTIVE_STEP)
+        if cast[-1] != n - 1:
+            cast.append(n - 1)
+        for i in cast:
+            (scan.ranges[i], scan.masks[i]) = self.query_ray(env, scan,
+                                                             pose, i)
+
+        gaps = zip(cast[:-1], cast[1:])
+        while len(gaps) > 0:
+            (i, j) = gaps.pop()
+            if j - i < 2:
+                continue
+            if (scan.masks[i] != scan.masks[j] or
+                abs(scan.ranges[i] - scan.ranges[j]) >
+                geometry.ADAPTIVE_TOLERANCE):
+                middle = (i + j) / 2
+                (scan.ranges[middle], scan.masks[middle]) = \
+                    self.query_ray(env, scan, pose, middle)
+                gaps.append((i, middle))
+                gaps.append((middle, j))
+            else:
+                step = (scan.ranges[j] - scan.ranges[i]) / (j - i)
+                for k in range(i + 1, j):
+                    scan.ranges[k] = scan.ranges[i] + (k - i) * step
+                    scan.masks[k] = scan.masks[i]
+
+    def query_ray(self, env, scan, (x, y, cos_heading, sin_heading), i):
+        """ Cast ray i from the robot at (x, y), rotated by the given heading,
+        and return its (range, mask). """
+        geometry = self.geometry
+
+        # Rotate the precomputed ray direction by the robot's heading.
+        c = cos_heading * geometry.cosines[i] - \
+            sin_heading * geometry.sines[i]
+        s = sin_heading * geometry.cosines[i] + \
+            cos_heading * geometry.sines[i]
+        x1 = int(x + scan.INNER_RADIUS * c)
+        y1 = int(y + scan.INNER_RADIUS * s)
+        x2 = int(x + scan.OUTER_RADIUS * c)
+        y2 = int(y + scan.OUTER_RADIUS * s)
+
+        query_info = env.segment_query_first((x1, y1), (x2, y2), \
+                                             RAY_RADIUS, geometry.shape_filter)
+        if query_info == None or query_info.shape == None:
+            return scan.RANGE_MAX, 0
+
+        value = query_info.alpha * scan.RANGE_MAX
+        object_mask = query_info.shape.filter.categories
+        if object_mask & self.acceptance_mask == 0:
+            # The detected shape is not accepted, we will treat
+            # it as a wall.
+            object_mask = WALL_MASK
+        return value, object_mask
+
+    def cast_numpy(self, env, robot, scan):
+        """ Fill in the scan by casting all rays at once against the shapes
+        found within their bounding box, with the 'numpy' or 'zbuffer'
+        algorithm (see cast_all). """
+        (alphas, masks) = self.cast_all(env,
+                                        np.array([robot.body.position.x]),
+                                        np.array([robot.body.position.y]),
+                                        np.array([robot.body.angle]),
+                                        np.array([robot.radius]))
+        scan.ranges = (alphas[0] * scan.RANGE_MAX).tolist()
+        scan.masks = masks[0].tolist()
+
+    def compute_batch(self, env, robots):
+        """ Returns a BatchScan holding the scans this scanner would take
+        from each of the given robots.  With the 'numpy' algorithm the rays
+        of all robots are cast together, so the shapes are looked up and
+        converted to arrays once rather than once per robot.  With
+        'segment_query' there is nothing to share and each robot is scanned
+        in turn, no faster than one at a time. """
+        geometry = self.geometry
+        number_robots = len(robots)
+        ranges = np.empty((number_robots, geometry.NUMBER_POINTS))
+        masks = np.zeros((number_robots, geometry.NUMBER_POINTS), dtype=int)
+
+        states = [self.scan_state(env, robot) for robot in robots]
+        stale = []
+        for (i, robot) in enumerate(robots):
+            if self.reusable(robot, states[i]):
+                (old_state, ranges[i], masks[i]) = self.previous_scans[robot]
+            else:
+                stale.append(i)
+        if len(stale) == 0:
+            return BatchScan(geometry, robots, ranges, masks)
+
+        if geometry.ALGORITHM != "segment_query":
+            (xs, ys, headings, radii) = pose_arrays([robots[i]
+                                                     for i in stale])
+            (alphas, stale_masks) = self.cast_all(env, xs, ys, headings,
+                                                  radii)
+            ranges[stale] = alphas * geometry.RANGE_MAX
+            masks[stale] = stale_masks
+        else:
+            for i in stale:
+                scan = RangeScan(geometry, robots[i])
+                self.cast_segment_queries(env, robots[i], scan)
+                ranges[i] = scan.ranges
+                masks[i] = scan.masks
+
+        for i in stale:
+            self.remember(robots[i], states[i], ranges[i].tolist(),
+                          masks[i].tolist())
+        return BatchScan(geometry, robots, ranges, masks)
+
+    def scan_state(self, env, robot):
+        """ Return the state of what a scan from the robot depends on, as a
+        tuple (x, y, angle, static_version, dynamic).  'dynamic' maps each
+        dynamic shape within range to its body's (x, y, angle).  Returns
+        None if scans aren't reused. """
+        geometry = self.geometry
+        if not geometry.REUSE_SCANS:
+            return None
+
+        body = robot.body
+        x = body.position.x
+        y = body.position.y
+        occluders = self.static_occluders
+        if occluders == None:
+            static_version = None
+            dynamic_mask = self.detection_mask
+        else:
+            static_version = occluders.version
+            dynamic_mask = occluders.dynamic_mask(self.detection_mask)
+
+        dynamic = {}
+        if dynamic_mask != 0:
+            reach = (robot.radius + geometry.RANGE_MIN + geometry.RANGE_MAX +
+                     RAY_RADIUS + geometry.REUSE_DISTANCE)
+            bb = BB(x - reach, y - reach, x + reach, y + reach)
+            for shape in env.bb_query(bb, ShapeFilter(mask=dynamic_mask)):
+                shape_body = shape.body
+                if shape.sensor or shape_body.body_type == Body.STATIC:
+                    continue
+                position = shape_body.position
+                dynamic[shape] = (position.x, position.y, shape_body.angle)
+
+        return (x, y, body.angle, static_version, dynamic)
+
+    def reusable(self, robot, state):
+        """ Whether the last scan from the robot can stand in for a new one
+        taken in the given state.  Counts the scans reused and cast. """
+        if state != None and robot in self.previous_scans:
+            old_state = self.previous_scans[robot][0]
+            if self.close(old_state, state):
+                self.scans_reused += 1
+                return True
+        self.scans_cast += 1
+        return False
+
+    def close(self, (x0, y0, angle0, static_version0, dynamic0),
+              (x, y, angle, static_version, dynamic)):
+        """ Whether nothing has moved further than reuse_distance, or turned
+        further than reuse_angle, between two states. """
+        distance = self.geometry.REUSE_DISTANCE
+        turn = self.geometry.REUSE_ANGLE
+        if (static_version != static_version0 or
+            abs(x - x0) > distance or abs(y - y0) > distance or
+            abs(angle - angle0) > turn or len(dynamic) != len(dynamic0)):
+            return False
+        for (shape, (shape_x, shape_y, shape_angle)) in dynamic.iteritems():
+            if shape not in dynamic0:
+                return False
+            (shape_x0, shape_y0, shape_angle0) = dynamic0[shape]
+            if (abs(shape_x - shape_x0) > distance or
+                abs(shape_y - shape_y0) > distance or
+                abs(shape_angle - shape_angle0) > turn):
+                return False
+        return True
+
+    def remember(self, robot, state, ranges, masks):
+        if state != None:
+            self.previous_scans[robot] = (state, list(ranges), list(masks))
+
+    def cast_all(self, env, xs, ys, headings, radii):
+        """ Cast this scanner's rays from each of the poses given by the
+        arrays 'xs', 'ys' and 'headings' (for robots of the given radii),
+        against the shapes found within the bounding box of all of the rays.
+        Returns arrays (alphas, masks) with a row per pose.
+
+        The 'numpy' algorithm gives the same masks as cast_segment_queries
+        and the same ranges, up to rounding.  The 'zbuffer' algorithm treats
+        the scan as an angular depth buffer: each nearby shape is projected
+        onto the span of rays its bounding circle covers, and every ray keeps
+        the nearest hit drawn into it.  Its cost grows with the number of
+        nearby shapes and the rays they cover.  Where chipmunk's answer
+        depends on the order it searches its spatial index it isn't asked,
+        so a ray grazing two shapes may report the other one. """
+        rays = self.ray_ends(xs, ys, headings, radii)
+        shapes = find_shapes(env, rays_bb(rays), self.detection_mask,
+                             self.static_occluders)
+        return self.cast_shapes(env, shapes, rays, xs, ys, headings, radii)
+
+    def ray_ends(self, xs, ys, headings, radii):
+        """ Return the arrays (x1, y1, x2, y2) of the ends of the rays cast
+        from each pose, the rays of pose i being numbered from
+        i * NUMBER_POINTS. """
+        geometry = self.geometry
+
+        # Rotate the precomputed ray directions by each heading.
+        cos_headings = np.cos(headings)[:, np.newaxis]
+        sin_headings = np.sin(headings)[:, np.newaxis]
+        c = cos_headings * geometry.cosine_array - \
+            sin_headings * geometry.sine_array
+        s = sin_headings * geometry.cosine_array + \
+            cos_headings * geometry.sine_array
+        inner_radii = (radii + geometry.RANGE_MIN)[:, np.newaxis]
+        outer_radii = inner_radii + geometry.RANGE_MAX
+        x1 = (xs[:, np.newaxis] + inner_radii * c).ravel()
+        y1 = (ys[:, np.newaxis] + inner_radii * s).ravel()
+        x2 = (xs[:, np.newaxis] + outer_radii * c).ravel()
+        y2 = (ys[:, np.newaxis] + outer_radii * s).ravel()
+
+        # As in cast_segment_queries.
+        return np.trunc(x1), np.trunc(y1), np.trunc(x2), np.trunc(y2)
+
+    def cast_shapes(self, env, shapes, (x1, y1, x2, y2), xs, ys, headings,
+                    radii):
+        """ Cast the rays given by ray_ends against the ShapeArrays 'shapes',
+        which must hold every shape the rays may detect.  Returns arrays
+        (alphas, masks) with a row per pose. """
+        geometry = self.geometry
+
+        inner_radii = radii + geometry.RANGE_MIN
+        (ray_indices, shape_indices) = self.candidate_pairs(
+            shapes, xs, ys, headings, inner_radii,
+            inner_radii + geometry.RANGE_MAX)
+        if geometry.ALGORITHM == "zbuffer":
+            (alphas, categories) = zbuffer_rays(shapes, x1, y1, x2, y2,
+                                                RAY_RADIUS, ray_indices,
+                                                shape_indices)
+            uncertain = []
+        else:
+            (alphas, categories, uncertain) = cast_rays(
+                shapes, x1, y1, x2, y2, RAY_RADIUS, ray_indices,
+                shape_indices)
+
+        # Where chipmunk's answer depends on its spatial index, ask it.
+        for i in np.flatnonzero(uncertain):
+            query_info = env.segment_query_first((x1[i], y1[i]),
+                                                 (x2[i], y2[i]), RAY_RADIUS,
+                                                 geometry.shape_filter)
+            if query_info == None or query_info.shape == None:
+                alphas[i] = 1.0
+                categories[i] = 0
+            else:
+                alphas[i] = query_info.alpha
+                categories[i] = query_info.shape.filter.categories
+
+        # Detected shapes which are not accepted are treated as walls.
+        masks = np.where(categories & self.acceptance_mask == 0, WALL_MASK,
+                         categories)
+        masks[categories == 0] = 0
+        number_poses = len(xs)
+        return (alphas.reshape(number_poses, -1),
+                masks.reshape(number_poses, -1))
+
+    def candidate_pairs(self, shapes, xs, ys, headings, inner_radii,
+                        outer_radii):
+        """ Return arrays (ray_indices, shape_indices) of the rays which may
+        touch each shape, judged by the angle the shape subtends at each
+        pose: that of its bounding circle, or for a segment that of the part
+        of it within range.  Shapes which lie wholly inside the circle the
+        rays start from (such as the robot's own) are left out.  The rays
+        cast from pose i are numbered from i * NUMBER_POINTS. """
+        geometry = self.geometry
+
+        # Ray endpoints are truncated to integers, moving them by up to
+        # sqrt(2), so allow a little more than the ray's thickness.
+        slack = RAY_RADIUS + 2
+        reach = shapes.bound_radii + slack
+        dx = shapes.bound_x - xs[:, np.newaxis]
+        dy = shapes.bound_y - ys[:, np.newaxis]
+        distances = np.hypot(dx, dy)
+        in_range = ((distances - reach <= outer_radii[:, np.newaxis]) &
+                    (distances + reach > inner_radii[:, np.newaxis]))
+
+        # Only the (pose, shape) pairs within range are considered further.
+        (poses, indices) = np.nonzero(in_range)
+        dx = dx[poses, indices]
+        dy = dy[poses, indices]
+        distances = distances[poses, indices]
+        reach = reach[indices]
+        surrounding = distances <= reach
+        offsets = poses * geometry.NUMBER_POINTS
+
+        last_ray = geometry.NUMBER_POINTS - 1
+        if geometry.angle_delta == 0:
+            return pairs_from_ranges(offsets, offsets + last_ray, indices)
+
+        # The range of ray angles (relative to angle_min) reaching each shape,
+        # and the corresponding range of ray indices, padded by one.
+        with np.errstate(invalid='ignore'):
+            half_widths = np.arcsin(np.minimum(reach / distances, 1))
+        centres = np.arctan2(dy, dx)
+        segments = ((indices >= shapes.number_circles) &
+                    (indices < shapes.number_circles +
+                               shapes.number_segments))
+        if segments.any():
+            (centres[segments], half_widths[segments],
+             surrounding[segments]) = segment_spans(
+                shapes, indices[segments] - shapes.number_circles,
+                xs[poses[segments]], ys[poses[segments]],
+                outer_radii[poses[segments]], slack)
+        centres = centres - headings[poses] - geometry.ANGLE_MIN
+        starts = np.mod(centres - half_widths, 2*pi)
+        ends = starts + 2*half_widths
+
+        all_firsts = []
+        all_lasts = []
+        for turn in [-2*pi, 0, 2*pi]:
+            firsts = np.ceil((starts + turn) / geometry.angle_delta) - 1
+            lasts = np.floor((ends + turn) / geometry.angle_delta) + 1
+            firsts = np.where(surrounding, 0, np.maximum(firsts, 0))
+            lasts = np.where(surrounding, last_ray,
+                             np.minimum(lasts, last_ray))
+            if turn != 0:
+                lasts[surrounding] = -1
+            all_firsts.append(firsts + offsets)
+            all_lasts.append(lasts + offsets)
+
+        return pairs_from_ranges(np.concatenate(all_firsts),
+                                 np.concatenate(all_lasts),
+                                 np.tile(indices, 3))
+
+    def draw(self, robot, scan):
+        """ Draw each ray which hit something, coloured by what it hit. """
+        geometry = self.geometry
+
+        x = robot.body.position.x
+        y = robot.body.position.y
+        cos_heading = cos(robot.body.angle)
+        sin_heading = sin(robot.body.angle)
+
+        for i in range(geometry.NUMBER_POINTS):
+            object_mask = scan.masks[i]
+            if object_mask == 0:
+                continue
+
+            c = cos_heading * geometry.cosines[i] - \
+                sin_heading * geometry.sines[i]
+            s = sin_heading * geometry.cosines[i] + \
+                cos_heading * geometry.sines[i]
+            x1 = int(x + scan.INNER_RADIUS * c)
+            y1 = int(y + scan.INNER_RADIUS * s)
+            x2 = int(x + (scan.INNER_RADIUS + scan.ranges[i]) * c)
+            y2 = int(y + (scan.INNER_RADIUS + scan.ranges[i]) * s)
+            if object_mask == WALL_MASK:
+                pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
+                             ('v2f', (x1, y1, x2, y2)),
+                             ('c3B', (255, 255, 0, 255, 255, 0)))
+                #pass
+            elif object_mask == ROBOT_MASK:
+                pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
+                             ('v2f', (x1, y1, x2, y2)),
+                             ('c3B', (0, 255, 255, 0, 255, 255)))
+            elif object_mask == BLAST_LANDMARK_MASK:
+                pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
+                             ('v2f', (x1, y1, x2, y2)),
+                             ('c3B', (255, 100, 100, 255, 100, 100)))
+            elif object_mask == POLE_LANDMARK_MASK:
+                pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
+                             ('v2f', (x1, y1, x2, y2)),
+                             ('c3B', (100, 100, 255, 100, 100, 255)))
+            elif object_mask == ARC_LANDMARK_MASK:
+                pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
+                             ('v2f', (x1, y1, x2, y2)),
+                             ('c3B', (100, 255, 100, 100, 255, 100)))
+            elif object_mask == RED_PUCK_MASK:
+                pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
+                             ('v2f', (x1, y1, x2, y2)),
+                             ('c3B', (255, 0, 0, 255, 0, 0)))
+            elif object_mask == GREEN_PUCK_MASK:
+                pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
+                             ('v2f', (x1, y1, x2, y2)),
+                             ('c3B', (0, 255, 0, 0, 255, 0)))
+            elif object_mask == BLUE_PUCK_MASK:
+                pyglet.graphics.draw(2, pyglet.gl.GL_LINES,
+                             ('v2f', (x1, y1, x2, y2)),
+                             ('c3B', (0, 0, 255, 0, 0, 255)))
+
+def segment_spans(shapes, i, xs, ys, outer_radii, slack):
+    """ Return arrays (centres, half_widths, surrounding) giving the range of
+    directions in which the rays from each pose (xs[j], ys[j]) may touch
+    segment i[j]: the part of it within outer_radii[j] + slack, thickened by
+    its radius and the slack.  'surrounding' is set where the pose itself is
+    that close to the segment, so that any direction may touch it. """
+    ax = shapes.segment_ax[i] - xs
+    ay = shapes.segment_ay[i] - ys
+    bx = shapes.segment_bx[i] - xs
+    by = shapes.segment_by[i] - ys
+    thickness = shapes.segment_radii[i] + slack
+    reach = outer_radii + thickness
+
+    # Clip the segment to the circle of radius 'reach' around the pose.
+    dx = bx - ax
+    dy = by - ay
+    qa = dx*dx + dy*dy
+    qb = ax*dx + ay*dy
+    qc = ax*ax + ay*ay - reach*reach
+    with np.errstate(divide='ignore', invalid='ignore'):
+        root = np.sqrt(np.maximum(qb*qb - qa*qc, 0))
+        t0 = np.clip((-qb - root) / qa, 0, 1)
+        t1 = np.clip((-qb + root) / qa, 0, 1)
+    t0 = np.where(qa == 0, 0, t0)
+    t1 = np.where(qa == 0, 0, t1)
+    (x0, y0) = (ax + t0*dx, ay + t0*dy)
+    (x1, y1) = (ax + t1*dx, ay + t1*dy)
+
+    # The directions of the clipped ends, widened by the thickness.
+    angles0 = np.arctan2(y0, x0)
+    turns = np.mod(np.arctan2(y1, x1) - angles0 + pi, 2*pi) - pi
+    distances0 = np.hypot(x0, y0)
+    distances1 = np.hypot(x1, y1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        widths = np.arcsin(np.minimum(thickness /
+                                      np.minimum(distances0, distances1), 1))
+
+    # The closest point of the segment to the pose.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(qa == 0, 0, np.clip(-qb / qa, 0, 1))
+    surrounding = np.hypot(ax + t*dx, ay + t*dy) <= thickness
+    return angles0 + turns / 2, np.abs(turns) / 2 + widths, surrounding
+
+def pose_arrays(robots):
+    """ Return arrays (xs, ys, headings, radii) describing the robots. """
+    xs = np.array([robot.body.position.x for robot in robots])
+    ys = np.array([robot.body.position.y for robot in robots])
+    headings = np.array([robot.body.angle for robot in robots])
+    radii = np.array([robot.radius for robot in robots], dtype=float)
+    return xs, ys, headings, radii
+
+def rays_bb((x1, y1, x2, y2)):
+    """ The bounding box of the rays, thickened as the queries are. """
+    return BB(min(x1.min(), x2.min()) - RAY_RADIUS,
+              min(y1.min(), y2.min()) - RAY_RADIUS,
+              max(x1.max(), x2.max()) + RAY_RADIUS,
+              max(y1.max(), y2.max()) + RAY_RADIUS)
+
+def find_shapes(env, bb, detection_mask, static_occluders=None):
+    """ Return a ShapeArrays of the non-sensor shapes within the bounding box
+    which a query with the detection mask would accept.  If a
+    StaticOccluders is given, the static shapes come from it (whether in
+    the box or not) and only the dynamic ones are looked up in the Space. """
+    if static_occluders == None:
+        return ShapeArrays([shape for shape in
+                            env.bb_query(bb, ShapeFilter(mask=detection_mask))
+                            if not shape.sensor])
+
+    shapes = static_occluders.shapes_for(detection_mask)
+    dynamic_mask = static_occluders.dynamic_mask(detection_mask)
+    if dynamic_mask != 0:
+        dynamic_shapes = [shape for shape in
+                          env.bb_query(bb, ShapeFilter(mask=dynamic_mask))
+                          if not shape.sensor and
+                             shape.body.body_type != Body.STATIC]
+        if len(dynamic_shapes) > 0:
+            shapes = shapes.merge(ShapeArrays(dynamic_shapes))
+    return shapes
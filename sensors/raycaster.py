@@ -0,0 +1,450 @@
+""" A NumPy ray caster which intersects a whole batch of rays with a set of
+shapes at once.  It reproduces the queries made by pymunk's
+Space.segment_query_first (chipmunk's thick segment queries against circles,
+segments and convex polygons), but as array operations over (ray, shape)
+pairs rather than one call into chipmunk per ray. """
+
+from math import sqrt
+import numpy as np
+from pymunk import Circle, Segment, Poly
+
+class ShapeArrays(object):
+    """ The world-space geometry of a list of shapes, as NumPy arrays.  Shapes
+    are numbered circles first, then segments, then polygons.  Polygons are
+    stored face by face, the faces of each polygon being contiguous.  Face i
+    of a polygon runs from vertex i-1 to vertex i, as in chipmunk. """
+
+    def __init__(self, shapes=()):
+        circles = []
+        segments = []
+        faces = []
+        polys = []
+
+        for shape in shapes:
+            (kind, row, shape_faces) = shape_rows(shape)
+            if kind == Circle:
+                circles.append(row)
+            elif kind == Segment:
+                segments.append(row)
+            elif kind == Poly:
+                polys.append((len(faces),) + row)
+                faces.extend(shape_faces)
+
+        self.set_rows(np.array(circles, dtype=float).reshape(-1, 4),
+                      np.array(segments, dtype=float).reshape(-1, 8),
+                      np.array(faces, dtype=float).reshape(-1, 6),
+                      np.array(polys, dtype=float).reshape(-1, 4))
+
+    def set_rows(self, circles, segments, faces, polys):
+        """ Set up the arrays from one row per circle, segment, polygon face
+        and polygon, as built by __init__. """
+        self.circles = circles
+        self.segments = segments
+        self.faces = faces
+        self.polys = polys
+
+        (self.circle_x, self.circle_y, self.circle_radii,
+         circle_categories) = circles.T
+
+        (self.segment_ax, self.segment_ay, self.segment_bx, self.segment_by,
+         self.segment_nx, self.segment_ny, self.segment_radii,
+         segment_categories) = segments.T
+
+        (self.face_x, self.face_y, self.face_prev_x, self.face_prev_y,
+         self.face_nx, self.face_ny) = faces.T
+        self.poly_face_starts = polys[:, 0].astype(int)
+        self.poly_face_counts = polys[:, 1].astype(int)
+        self.poly_radii = polys[:, 2]
+        poly_categories = polys[:, 3]
+
+        self.number_circles = len(circles)
+        self.number_segments = len(segments)
+        self.number_polys = len(polys)
+        self.categories = np.concatenate((circle_categories,
+                                          segment_categories,
+                                          poly_categories)).astype(int)
+
+        # Bounding boxes, computed as chipmunk does.
+        self.bb_left = np.concatenate((
+            self.circle_x - self.circle_radii,
+            np.minimum(self.segment_ax, self.segment_bx) - self.segment_radii,
+            self.poly_min(self.face_x) - self.poly_radii))
+        self.bb_bottom = np.concatenate((
+            self.circle_y - self.circle_radii,
+            np.minimum(self.segment_ay, self.segment_by) - self.segment_radii,
+            self.poly_min(self.face_y) - self.poly_radii))
+        self.bb_right = np.concatenate((
+            self.circle_x + self.circle_radii,
+            np.maximum(self.segment_ax, self.segment_bx) + self.segment_radii,
+            self.poly_max(self.face_x) + self.poly_radii))
+        self.bb_top = np.concatenate((
+            self.circle_y + self.circle_radii,
+            np.maximum(self.segment_ay, self.segment_by) + self.segment_radii,
+            self.poly_max(self.face_y) + self.poly_radii))
+
+        # A circle around each bounding box, for culling.
+        self.bound_x = (self.bb_left + self.bb_right) / 2
+        self.bound_y = (self.bb_bottom + self.bb_top) / 2
+        self.bound_radii = np.hypot(self.bb_right - self.bb_left,
+                                    self.bb_top - self.bb_bottom) / 2
+
+    def __len__(self):
+        return len(self.categories)
+
+    def merge(self, other):
+        """ Return a new ShapeArrays holding the shapes of both.  The shapes
+        are renumbered, still circles first, then segments, then polygons. """
+        polys = other.polys.copy()
+        polys[:, 0] += len(self.faces)
+        merged = ShapeArrays()
+        merged.set_rows(np.concatenate((self.circles, other.circles)),
+                        np.concatenate((self.segments, other.segments)),
+                        np.concatenate((self.faces, other.faces)),
+                        np.concatenate((self.polys, polys)))
+        return merged
+
+    def poly_min(self, values):
+        if self.number_polys == 0:
+            return np.empty(0)
+        return np.minimum.reduceat(values, self.poly_face_starts)
+
+    def poly_max(self, values):
+        if self.number_polys == 0:
+            return np.empty(0)
+        return np.maximum.reduceat(values, self.poly_face_starts)
+
+def shape_rows(shape):
+    """ Return (kind, row, faces) for a shape: its class and its row in the
+    circle, segment or polygon arrays (less the polygon's first face), plus
+    the rows of a polygon's faces. """
+    body = shape.body
+    categories = shape.filter.categories
+    if isinstance(shape, Circle):
+        c = body.local_to_world(shape.offset)
+        return Circle, (c.x, c.y, shape.radius, categories), ()
+    elif isinstance(shape, Segment):
+        a = body.local_to_world(shape.a)
+        b = body.local_to_world(shape.b)
+        (nx, ny) = world_vector(body, shape.normal)
+        return (Segment, (a.x, a.y, b.x, b.y, nx, ny, shape.radius,
+                          categories), ())
+    elif isinstance(shape, Poly):
+        local_vertices = shape.get_vertices()
+        vertices = [body.local_to_world(v) for v in local_vertices]
+        faces = []
+        for i in range(len(vertices)):
+            edge = local_vertices[i] - local_vertices[i - 1]
+            (nx, ny) = world_vector(body, normalize(rperp(edge)))
+            faces.append((vertices[i].x, vertices[i].y,
+                          vertices[i - 1].x, vertices[i - 1].y, nx, ny))
+        return Poly, (len(vertices), shape.radius, categories), faces
+    return None, None, ()
+
+def normalize((x, y)):
+    # As cpvnormalize, so that normals match chipmunk's to the last bit.
+    inverse_length = 1.0 / sqrt(x*x + y*y)
+    return (x * inverse_length, y * inverse_length)
+
+def rperp((x, y)):
+    return (y, -x)
+
+def world_vector(body, (x, y)):
+    """ Rotate a vector from the body's frame into the world frame. """
+    (c, s) = body.rotation_vector
+    return (c*x - s*y, s*x + c*y)
+
+def cast_rays(shapes, ax, ay, bx, by, radius, ray_indices=None,
+              shape_indices=None):
+    """ Intersect the rays from (ax, ay) to (bx, by), each an array with one
+    entry per ray and thickened by 'radius', with the ShapeArrays 'shapes'.
+    Only the (ray, shape) pairs given by 'ray_indices' and 'shape_indices'
+    are tested, or every pair if these are None.  The shape filter is not
+    applied here, so 'shapes' should hold only those shapes the query would
+    accept.  As with Space.segment_query_first, a ray starting within
+    'radius' of a shape hits it with alpha 0.
+
+    Returns the arrays (alphas, categories, uncertain) giving, for each ray,
+    the fraction of the way along it of the first hit and the categories of
+    the shape hit (1 and 0 if nothing was hit), and whether chipmunk might
+    answer differently.  chipmunk only tests a shape if the ray itself (not
+    thickened) enters the shape's bounding box before the best hit found so
+    far, so its answer depends on the order in which it searches its spatial
+    index unless the ray enters the box of the nearest shape hit before it
+    hits any other.  Rays for which that fails, or which hit two shapes at
+    the same point, should be queried again with Space.segment_query_first.
+    """
+
+    ax = np.asarray(ax, dtype=float)
+    ay = np.asarray(ay, dtype=float)
+    bx = np.asarray(bx, dtype=float)
+    by = np.asarray(by, dtype=float)
+    number_rays = len(ax)
+
+    if ray_indices is None:
+        (ray_indices, shape_indices) = np.indices((number_rays, len(shapes)))
+        ray_indices = ray_indices.ravel()
+        shape_indices = shape_indices.ravel()
+
+    alphas = np.ones(number_rays)
+    categories = np.zeros(number_rays, dtype=int)
+    uncertain = np.zeros(number_rays, dtype=bool)
+    (pair_rays, pair_shapes, pair_alphas) = pair_hits(
+        shapes, ax, ay, bx, by, radius, ray_indices, shape_indices)
+    if len(pair_rays) == 0:
+        return alphas, categories, uncertain
+
+    # Sort the pairs by ray and then alpha, to find the nearest two hits of
+    # each ray.
+    order = np.lexsort((pair_alphas, pair_rays))
+    pair_rays = pair_rays[order]
+    pair_shapes = pair_shapes[order]
+    pair_alphas = pair_alphas[order]
+    firsts = np.flatnonzero(np.r_[True, pair_rays[1:] != pair_rays[:-1]])
+    seconds = firsts + 1
+    has_second = np.r_[firsts[1:] != seconds[:-1],
+                       seconds[-1] < len(pair_rays)]
+
+    rays = pair_rays[firsts]
+    first = pair_shapes[firsts]
+    first_alphas = pair_alphas[firsts]
+    second_alphas = np.ones(len(firsts))
+    second_alphas[has_second] = np.minimum(pair_alphas[seconds[has_second]], 1)
+    hit = first_alphas < 1
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entries = bb_entries(shapes.bb_left[first], shapes.bb_bottom[first],
+                             shapes.bb_right[first], shapes.bb_top[first],
+                             ax[rays], ay[rays], bx[rays], by[rays])
+
+    alphas[rays] = np.where(hit, first_alphas, 1.0)
+    categories[rays] = np.where(hit, shapes.categories[first], 0)
+    uncertain[rays] = hit & ((entries >= second_alphas) |
+                             (first_alphas == second_alphas))
+    return alphas, categories, uncertain
+
+def pair_hits(shapes, ax, ay, bx, by, radius, ray_indices, shape_indices):
+    """ Intersect each (ray, shape) pair.  Returns the arrays (ray_indices,
+    shape_indices, alphas) of the pairs, regrouped by the kind of shape, with
+    an infinite alpha where the ray misses. """
+
+    # Split the pairs by the kind of shape.
+    number_circles = shapes.number_circles
+    number_lines = number_circles + shapes.number_segments
+    kinds = [shape_indices < number_circles,
+             (shape_indices >= number_circles) & (shape_indices < number_lines),
+             shape_indices >= number_lines]
+    queries = [circle_alphas, segment_alphas, poly_alphas]
+    offsets = [0, number_circles, number_lines]
+
+    pair_rays = []
+    pair_shapes = []
+    pair_alphas = []
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for (kind, query, offset) in zip(kinds, queries, offsets):
+            rays = ray_indices[kind]
+            indices = shape_indices[kind]
+            if len(rays) == 0:
+                continue
+            pair_rays.append(rays)
+            pair_shapes.append(indices)
+            pair_alphas.append(query(shapes, indices - offset, ax[rays],
+                                     ay[rays], bx[rays], by[rays], radius))
+
+    if len(pair_rays) == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0)
+    return (np.concatenate(pair_rays), np.concatenate(pair_shapes),
+            np.concatenate(pair_alphas))
+
+def zbuffer_rays(shapes, ax, ay, bx, by, radius, ray_indices, shape_indices):
+    """ As cast_rays, but treating the rays as the bins of an angular depth
+    buffer: each (ray, shape) pair is drawn into its ray's bin, which keeps
+    the nearest hit.  Nothing is sorted and no ray is checked against
+    chipmunk's search order, so where chipmunk's answer depends on that
+    order (see cast_rays) the hit kept may differ from its.  Returns the
+    arrays (alphas, categories). """
+
+    ax = np.asarray(ax, dtype=float)
+    ay = np.asarray(ay, dtype=float)
+    bx = np.asarray(bx, dtype=float)
+    by = np.asarray(by, dtype=float)
+
+    (pair_rays, pair_shapes, pair_alphas) = pair_hits(
+        shapes, ax, ay, bx, by, radius, ray_indices, shape_indices)
+
+    depths = np.ones(len(ax))
+    np.minimum.at(depths, pair_rays, pair_alphas)
+
+    # Of the shapes at the depth of the nearest hit, any one will do.
+    categories = np.zeros(len(ax), dtype=int)
+    nearest = (pair_alphas == depths[pair_rays]) & (pair_alphas < 1)
+    categories[pair_rays[nearest]] = shapes.categories[pair_shapes[nearest]]
+    return depths, categories
+
+def pairs_from_ranges(firsts, lasts, range_shapes):
+    """ Given ranges of rays, from firsts[i] to lasts[i] inclusive, each
+    belonging to the shape range_shapes[i], return the arrays (ray_indices,
+    shape_indices) of the pairs within the ranges. """
+
+    counts = np.maximum(np.asarray(lasts) - firsts + 1, 0).astype(int)
+    starts = np.cumsum(counts) - counts
+    ray_indices = (np.repeat(np.asarray(firsts, dtype=int) - starts, counts) +
+                   np.arange(counts.sum()))
+    shape_indices = np.repeat(range_shapes, counts)
+    return ray_indices, shape_indices
+
+def bb_entries(left, bottom, right, top, ax, ay, bx, by):
+    """ Where each ray enters its bounding box, as a fraction of the way along
+    it, or infinity if it misses.  As chipmunk's cpBBSegmentQuery. """
+
+    (t_min_x, t_max_x) = slab(left, right, ax, bx - ax)
+    (t_min_y, t_max_y) = slab(bottom, top, ay, by - ay)
+    t_min = np.maximum(t_min_x, t_min_y)
+    t_max = np.minimum(t_max_x, t_max_y)
+    return np.where((t_min <= t_max) & (0 <= t_max) & (t_min <= 1),
+                    np.maximum(t_min, 0), np.inf)
+
+def slab(low, high, a, delta):
+    """ The interval of t for which a + t*delta lies between low and high. """
+
+    t1 = (low - a) / delta
+    t2 = (high - a) / delta
+    inside = (low <= a) & (a <= high)
+    t_min = np.where(delta == 0, np.where(inside, -np.inf, np.inf),
+                     np.minimum(t1, t2))
+    t_max = np.where(delta == 0, np.where(inside, np.inf, -np.inf),
+                     np.maximum(t1, t2))
+    return t_min, t_max
+
+def circle_query(cx, cy, r1, ax, ay, bx, by, r2):
+    """ chipmunk's CircleSegmentQuery for each ray and circle.  Returns the
+    alphas, infinite where missed. """
+
+    dax = ax - cx
+    day = ay - cy
+    dbx = bx - cx
+    dby = by - cy
+    da_da = dax*dax + day*day
+    da_db = dax*dbx + day*dby
+    db_db = dbx*dbx + dby*dby
+    rsum = r1 + r2
+
+    qa = da_da - 2.0*da_db + db_db
+    qb = da_db - da_da
+    det = qb*qb - qa*(da_da - rsum*rsum)
+    t = (-qb - np.sqrt(det)) / qa
+
+    return np.where((det >= 0) & (0 <= t) & (t <= 1), t, np.inf)
+
+def closest_distance(px, py, x1, y1, x2, y2):
+    """ Distance from each point to each segment, as chipmunk's
+    cpClosetPointOnSegment. """
+
+    dx = x1 - x2
+    dy = y1 - y2
+    t = np.clip((dx*(px - x2) + dy*(py - y2)) / (dx*dx + dy*dy), 0, 1)
+    ex = px - (x2 + dx*t)
+    ey = py - (y2 + dy*t)
+    return np.sqrt(ex*ex + ey*ey)
+
+def circle_alphas(shapes, i, ax, ay, bx, by, radius):
+    cx = shapes.circle_x[i]
+    cy = shapes.circle_y[i]
+    r = shapes.circle_radii[i]
+
+    alphas = circle_query(cx, cy, r, ax, ay, bx, by, radius)
+
+    # The start of the ray touches the circle.
+    start_distance = np.sqrt((ax - cx)*(ax - cx) + (ay - cy)*(ay - cy)) - r
+    return np.where(start_distance <= radius, 0.0, alphas)
+
+def segment_alphas(shapes, i, ax, ay, bx, by, radius):
+    """ As chipmunk's cpSegmentShapeSegmentQuery. """
+
+    tax = shapes.segment_ax[i]
+    tay = shapes.segment_ay[i]
+    tbx = shapes.segment_bx[i]
+    tby = shapes.segment_by[i]
+    nx = shapes.segment_nx[i]
+    ny = shapes.segment_ny[i]
+    seg_r = shapes.segment_radii[i]
+
+    d = (tax - ax)*nx + (tay - ay)*ny
+    r = seg_r + radius
+
+    flip = np.where(d > 0, -1.0, 1.0)
+    offset_x = flip*nx*r - ax
+    offset_y = flip*ny*r - ay
+    seg_ax = tax + offset_x
+    seg_ay = tay + offset_y
+    seg_bx = tbx + offset_x
+    seg_by = tby + offset_y
+    delta_x = bx - ax
+    delta_y = by - ay
+
+    # The ray crosses the side of the thickened segment...
+    crosses = ((delta_x*seg_ay - delta_y*seg_ax) *
+               (delta_x*seg_by - delta_y*seg_bx) <= 0)
+    d_offset = d + flip*r
+    ad = -d_offset
+    bd = delta_x*nx + delta_y*ny - d_offset
+    side_alphas = np.where(ad*bd < 0, ad / (ad - bd), np.inf)
+
+    # ...otherwise it can only hit one of the rounded ends.
+    end_alphas = np.minimum(
+        circle_query(tax, tay, seg_r, ax, ay, bx, by, radius),
+        circle_query(tbx, tby, seg_r, ax, ay, bx, by, radius))
+    end_alphas = np.where(r != 0, end_alphas, np.inf)
+
+    alphas = np.where(crosses, side_alphas, end_alphas)
+
+    start_distance = closest_distance(ax, ay, tax, tay, tbx, tby) - seg_r
+    return np.where(start_distance <= radius, 0.0, alphas)
+
+def poly_alphas(shapes, i, ax, ay, bx, by, radius):
+    """ As chipmunk's cpPolyShapeSegmentQuery.  A ray entering a convex
+    polygon crosses only one face from outside, so taking the nearest face
+    hit matches chipmunk's choice of the last. """
+
+    # Expand each (ray, polygon) pair into one (ray, face) pair per face.
+    counts = shapes.poly_face_counts[i]
+    starts = np.cumsum(counts) - counts
+    faces = (np.repeat(shapes.poly_face_starts[i] - starts, counts) +
+             np.arange(counts.sum()))
+    ax = np.repeat(ax, counts)
+    ay = np.repeat(ay, counts)
+    bx = np.repeat(bx, counts)
+    by = np.repeat(by, counts)
+
+    vx = shapes.face_x[faces]
+    vy = shapes.face_y[faces]
+    prev_x = shapes.face_prev_x[faces]
+    prev_y = shapes.face_prev_y[faces]
+    nx = shapes.face_nx[faces]
+    ny = shapes.face_ny[faces]
+    r = np.repeat(shapes.poly_radii[i], counts)
+    rsum = r + radius
+
+    an = ax*nx + ay*ny
+    d = an - (vx*nx + vy*ny) - rsum
+    bn = bx*nx + by*ny
+    t = d / (an - bn)
+
+    point_x = ax*(1.0 - t) + bx*t
+    point_y = ay*(1.0 - t) + by*t
+    dt = nx*point_y - ny*point_x
+    dt_min = nx*prev_y - ny*prev_x
+    dt_max = nx*vy - ny*vx
+
+    face_hit = ((d >= 0) & (0 <= t) & (t <= 1) &
+                (dt_min <= dt) & (dt <= dt_max))
+    alphas = np.minimum(np.where(face_hit, t, np.inf),
+                        circle_query(vx, vy, r, ax, ay, bx, by, radius))
+    alphas = np.minimum.reduceat(alphas, starts)
+
+    # The start of the ray is inside the polygon or touches it.
+    outside = (nx*(ax - vx) + ny*(ay - vy)) > 0
+    outside = np.logical_or.reduceat(outside, starts)
+    edge_distance = closest_distance(ax, ay, prev_x, prev_y, vx, vy)
+    edge_distance = np.minimum.reduceat(edge_distance, starts)
+    touching = ~outside | (edge_distance - shapes.poly_radii[i] <= radius)
+    return np.where(touching, 0.0, alphas)
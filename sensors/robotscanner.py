@@ -1,11 +1,13 @@
-""" A RobotScanner senses only pucks. """
+""" A RobotScanner senses only robots. """
 
 import pyglet
 from math import pi, sqrt, atan2
 from pymunk import ShapeFilter
 from common.angles import normalize_angle_pm_pi
 
-class DetectedRobot:
+class DetectedRobot(object):
+    __slots__ = ("distance", "angle")
+
     def __init__(self, distance, angle):
         self.distance = distance
         self.angle = angle
@@ -23,16 +25,22 @@ class RobotScan:
         self.robots = []
 
 class RobotScanner:
-    def compute(self, env, this_robot, others, visualize=False):
-        """ Returns a PuckScan taken from the given environment, this robot,
-            and list of other robots. """
+    def compute(self, env, this_robot, robot_grid, visualize=False):
+        """ Returns a RobotScan taken from the given environment, this robot,
+            and ObjectGrid of robots (which may include this robot). """
 
         scan = RobotScan()
 
         if visualize:
             pyglet.gl.glLineWidth(4)
 
-        for bot in others:
+        position = this_robot.body.position
+        for bot in robot_grid.objects_in_sector(position.x, position.y,
+                                                this_robot.body.angle,
+                                                scan.MIN_ANGLE, scan.MAX_ANGLE,
+                                                scan.MAX_RANGE):
+            if bot is this_robot:
+                continue
             dx = bot.body.position.x - this_robot.body.position.x
             dy = bot.body.position.y - this_robot.body.position.y
             distance = sqrt(dx*dx + dy*dy)
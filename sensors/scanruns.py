@@ -0,0 +1,113 @@
+""" A run-length index of a RangeScan's masks.  Queries about where things are
+in a scan (the span of each landmark, the leftmost puck, ...) then look at one
+entry per run of rays rather than at every ray, which matters for scans with
+many rays. """
+
+import numpy as np
+
+class ScanRuns(object):
+    """ The maximal runs of consecutive rays with equal masks.  Run k covers
+    rays starts[k] to stops[k] (inclusive), which all have mask masks[k].  Its
+    closest hit is min_ranges[k], and its first and last rays point at
+    start_angles[k] and stop_angles[k]. """
+
+    def __init__(self, scan):
+        ranges, masks = scan.arrays()
+        n = len(masks)
+        changes = np.flatnonzero(masks[1:] != masks[:-1]) + 1
+        self.ranges = ranges
+        self.starts = np.concatenate([[0], changes]).astype(int)
+        self.stops = np.concatenate([changes - 1, [n - 1]]).astype(int)
+        self.masks = masks[self.starts]
+        self.min_ranges = np.minimum.reduceat(ranges, self.starts)
+        self.start_angles = scan.angle_array[self.starts]
+        self.stop_angles = scan.angle_array[self.stops]
+
+        # Prefix sums of the unit vectors along the rays, with and without
+        # weighting each by 1/(1 + range), for vector_sum().
+        angles = scan.angle_array
+        weights = 1.0 / (1.0 + ranges)
+        self.cos_sums = np.concatenate([[0], np.cumsum(np.cos(angles))])
+        self.sin_sums = np.concatenate([[0], np.cumsum(np.sin(angles))])
+        self.weighted_cos_sums = np.concatenate([[0],
+                                    np.cumsum(weights * np.cos(angles))])
+        self.weighted_sin_sums = np.concatenate([[0],
+                                    np.cumsum(weights * np.sin(angles))])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def spans(self, mask, wrap=False):
+        """ Return a list of (first, last) ray indices, one for each maximal
+        span of consecutive rays which hit something matching 'mask' (runs of
+        different masks which both match are joined).  If 'wrap' the scan is
+        treated as a full circle, so that a span running off the end of the
+        scan continues at its start.  Such a span comes first, as
+        (first, last) with first > last.  A scan in which every ray matches
+        has no spans when wrapped. """
+        matching = self.masks & mask != 0
+        if not matching.any():
+            return []
+
+        # Runs which match and don't follow a matching run begin a span, and
+        # those which match and aren't followed by one end it.
+        previous = np.concatenate([[False], matching[:-1]])
+        following = np.concatenate([matching[1:], [False]])
+        firsts = self.starts[matching & ~previous].tolist()
+        lasts = self.stops[matching & ~following].tolist()
+        spans = zip(firsts, lasts)
+
+        if wrap and matching[0] and matching[-1]:
+            if len(spans) == 1:
+                return []
+            spans = [(spans[-1][0], spans[0][1])] + spans[1:-1]
+        return spans
+
+    def leftmost(self, mask):
+        """ Return the index of the leftmost (highest-index) ray which hit
+        something matching 'mask', or None. """
+        matching = np.flatnonzero(self.masks & mask)
+        if len(matching) == 0:
+            return None
+        return int(self.stops[matching[-1]])
+
+    def closest(self, mask):
+        """ Return the index of the closest ray which hit something matching
+        'mask' (the first, if several are equally close), or None. """
+        matching = np.flatnonzero(self.masks & mask)
+        if len(matching) == 0:
+            return None
+        k = matching[np.argmin(self.min_ranges[matching])]
+        first = self.starts[k]
+        return int(first + np.argmin(self.ranges[first:self.stops[k] + 1]))
+
+    def vector_sum(self, first, last, weighted=False):
+        """ Return the sum (x, y) of the unit vectors along rays 'first' to
+        'last' (inclusive, and wrapping past the end of the scan if first >
+        last), each scaled by 1/(1 + range) if 'weighted'. """
+        if weighted:
+            cos_sums, sin_sums = self.weighted_cos_sums, self.weighted_sin_sums
+        else:
+            cos_sums, sin_sums = self.cos_sums, self.sin_sums
+        if first > last:
+            (x1, y1) = self.vector_sum(first, len(self.ranges) - 1, weighted)
+            (x2, y2) = self.vector_sum(0, last, weighted)
+            return (x1 + x2, y1 + y2)
+        return (cos_sums[last + 1] - cos_sums[first],
+                sin_sums[last + 1] - sin_sums[first])
+
+    def masked_vector_sum(self, mask, first, last, weighted=False):
+        """ Return (x, y, found): the vector_sum() of just those of rays
+        'first' to 'last' (inclusive) which hit something matching 'mask',
+        and whether there were any. """
+        x = y = 0.0
+        found = False
+        for (span_first, span_last) in self.spans(mask):
+            span_first = max(span_first, first)
+            span_last = min(span_last, last)
+            if span_first <= span_last:
+                (dx, dy) = self.vector_sum(span_first, span_last, weighted)
+                x += dx
+                y += dy
+                found = True
+        return (x, y, found)
@@ -1,9 +1,46 @@
-class SensorSuite:
-    def __init__(self, range_scan, landmark_scan):
-        self.range_scan = range_scan
-        self.landmark_scan = landmark_scan
-
-#    def __init__(self, range_scan, puck_scan, robot_scan):
-#        self.range_scan = range_scan
-#        self.puck_scan = puck_scan
-#        self.robot_scan = robot_scan
+class SensorSuite(object):
+    """ The scans available to a robot's controller: 'range_scan',
+    'landmark_scan', 'puck_scan' and 'robot_scan'.  Scans passed in 'scans'
+    (e.g. taken for all robots in one batch) are used as they are.  Any other
+    is taken from 'source' (an AlvinEngine) the first time it is read, so a
+    scan which the controller never looks at is never taken. """
+
+    SCAN_NAMES = ("range_scan", "landmark_scan", "puck_scan", "robot_scan")
+
+    __slots__ = ("source", "robot", "visualize") + SCAN_NAMES
+
+    def __init__(self, source, robot, scans={}, visualize=False):
+        self.source = source
+        self.robot = robot
+        self.visualize = visualize
+        self.reset(scans)
+
+    def reset(self, scans={}):
+        """ Drop the scans held so far and hold those in 'scans' instead, so
+        that one SensorSuite can serve a robot from step to step. """
+        for name in self.SCAN_NAMES:
+            if name in scans:
+                setattr(self, name, scans[name])
+            else:
+                try:
+                    delattr(self, name)
+                except AttributeError:
+                    pass
+
+    def __getattr__(self, name):
+        # Only called for scans which haven't been taken yet.
+        if name not in self.SCAN_NAMES:
+            raise AttributeError(name)
+        scan = self.source.take_scan(self.robot, name, self.visualize)
+        setattr(self, name, scan)
+        return scan
+
+    def __getstate__(self):
+        # Scans are only good for the step they were taken in (and reading an
+        # untaken one would take it).
+        return (self.source, self.robot, self.visualize)
+
+    def __setstate__(self, (source, robot, visualize)):
+        self.source = source
+        self.robot = robot
+        self.visualize = visualize
@@ -0,0 +1,62 @@
+""" The state of every puck and robot gathered into NumPy arrays in one call
+(see AlvinEngine.take_snapshot), so that metrics, loggers and batched sensors
+needn't each walk the entity lists one body at a time.  A snapshot's arrays
+are allocated once and refilled in place. """
+
+import numpy as np
+
+class WorldSnapshot(object):
+    """ Arrays with a row per puck or robot, in the order of the engine's
+    lists.  Pucks: 'puck_positions' (x, y), 'puck_kinds' and
+    'puck_immobile'.  Robots: 'robot_positions' (x, y), 'robot_angles',
+    'robot_velocities' (vx, vy, in the world frame) and 'robot_states' (each
+    controller's state_code()).  Positions, angles and velocities are of the
+    given dtype, float64 or float32.  'step' is the step the snapshot was
+    taken at. """
+
+    def __init__(self, number_pucks, number_robots, dtype=np.float64):
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float64, np.float32):
+            raise ValueError("A snapshot must be float64 or float32, not " +
+                             str(dtype))
+        self.dtype = dtype
+
+        self.puck_positions = np.zeros((number_pucks, 2), dtype)
+        self.puck_kinds = np.zeros(number_pucks, int)
+        self.puck_immobile = np.zeros(number_pucks, bool)
+
+        self.robot_positions = np.zeros((number_robots, 2), dtype)
+        self.robot_angles = np.zeros(number_robots, dtype)
+        self.robot_velocities = np.zeros((number_robots, 2), dtype)
+        self.robot_states = np.zeros(number_robots, int)
+
+        self.step = None
+
+    def fill(self, pucks, robots, step):
+        """ Copy the current state of the pucks and robots (which must be as
+        many as the snapshot was made for) into the arrays. """
+        if (len(pucks) != len(self.puck_kinds) or
+            len(robots) != len(self.robot_states)):
+            raise ValueError("Snapshot is for {} pucks and {} robots, not {} "
+                             "and {}".format(len(self.puck_kinds),
+                                             len(self.robot_states),
+                                             len(pucks), len(robots)))
+
+        positions = [puck.body.position for puck in pucks]
+        self.puck_positions[:] = np.reshape([(p.x, p.y) for p in positions],
+                                            (-1, 2))
+        self.puck_kinds[:] = [puck.kind for puck in pucks]
+        self.puck_immobile[:] = [puck.immobile for puck in pucks]
+
+        bodies = [robot.body for robot in robots]
+        positions = [body.position for body in bodies]
+        velocities = [body.velocity for body in bodies]
+        self.robot_positions[:] = np.reshape([(p.x, p.y) for p in positions],
+                                             (-1, 2))
+        self.robot_angles[:] = [body.angle for body in bodies]
+        self.robot_velocities[:] = np.reshape([(v.x, v.y)
+                                               for v in velocities], (-1, 2))
+        self.robot_states[:] = [robot.controller.state_code()
+                                for robot in robots]
+
+        self.step = step
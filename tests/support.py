@@ -0,0 +1,44 @@
+""" Helpers shared by the tests.  Run the tests from the top directory with
+
+    python -m unittest discover -s tests -t .
+"""
+
+import os, random, shutil, tempfile, unittest
+
+# Keep pyglet from needing a display, as alvinengine does.
+import pyglet
+pyglet.options['shadow_window'] = False
+
+from configsingleton import ConfigSingleton
+from alvinengine import AlvinEngine
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class EngineTestCase(unittest.TestCase):
+
+    def make_config(self, changes={}):
+        """ Make default.cfg, with the options in 'changes' (a dictionary
+        mapping (section, option) to value) replaced, the current config.
+        It is also written to a temporary directory (removed after the test)
+        and the file's name is returned. """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+
+        config = ConfigSingleton.reset_instance(os.path.join(REPO_DIR,
+                                                             "default.cfg"))
+        config.set("AlvinSim", "capture_screenshots", "False")
+        config.set("AlvinSim", "checkpoint_interval", "0")
+        for (section, option), value in changes.items():
+            config.set(section, option, str(value))
+
+        config_file = os.path.join(directory, "test.cfg")
+        with open(config_file, 'w') as output:
+            config.write(output)
+        return config_file
+
+    def make_engine(self, changes={}, seed=0):
+        """ Return a new AlvinEngine for trial 0 of the config made by
+        make_config(changes), placed with the given seed. """
+        config_file = self.make_config(changes)
+        random.seed(seed)
+        return AlvinEngine(config_file, 0)
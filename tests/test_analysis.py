@@ -0,0 +1,56 @@
+import random, unittest
+
+from tests.support import EngineTestCase
+from analysis import get_sec_moment
+
+def loop_sec_moment(pucks):
+    """ get_sec_moment() as it was computed before being vectorized. """
+    cx, cy = 0, 0
+    n = 0
+    for puck in pucks:
+        if not puck.immobile:
+            n += 1
+            cx += puck.body.position.x
+            cy += puck.body.position.y
+    if n > 0:
+        cx /= float(n)
+        cy /= float(n)
+
+    sec_moment = 0
+    for puck in pucks:
+        if not puck.immobile:
+            dx = puck.body.position.x - cx
+            dy = puck.body.position.y - cy
+            sec_moment += dx*dx + dy*dy
+    if n > 0:
+        radius = pucks[0].radius
+        sec_moment /= 4.0 * radius * radius
+
+    return sec_moment
+
+class SecMomentTest(EngineTestCase):
+
+    def test_matches_loop(self):
+        engine = self.make_engine({("AlvinSim", "number_pucks"): 300})
+        for i in range(20):
+            engine.step()
+
+        # Pretend some of the pucks are immobile, to be left out.
+        random.seed(3)
+        pucks = engine.pucks
+        for puck in random.sample(pucks, 30):
+            puck.immobile = True
+
+        expected = loop_sec_moment(pucks)
+        self.assertEqual(get_sec_moment(pucks), expected)
+        snapshot = engine.take_snapshot()
+        self.assertEqual(get_sec_moment(pucks, snapshot), expected)
+
+    def test_no_mobile_pucks(self):
+        engine = self.make_engine({("AlvinSim", "number_pucks"): 3})
+        for puck in engine.pucks:
+            puck.immobile = True
+        self.assertEqual(get_sec_moment(engine.pucks), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os, random, unittest
+
+from alvinengine import load_checkpoint, fork_checkpoint
+from configsingleton import ConfigSingleton
+from tests.support import EngineTestCase
+
+def body_states(things):
+    return [(tuple(thing.body.position), tuple(thing.body.velocity),
+             thing.body.angle, thing.body.angular_velocity)
+            for thing in things]
+
+class CheckpointTest(EngineTestCase):
+
+    def test_round_trip(self):
+        engine = self.make_engine({("LeftmostController", "modulate"): True,
+                                   ("AlvinSim", "controller_name"):
+                                   "LeftmostController"})
+        for i in range(20):
+            engine.step()
+        filename = os.path.join(os.path.dirname(engine.config_file),
+                                "test.ckpt")
+        engine.save_checkpoint(filename)
+        random_state = random.getstate()
+
+        random.seed(1)
+        restored = load_checkpoint(filename)
+        self.assertEqual(random.getstate(), random_state)
+        self.assertEqual(restored.steps, engine.steps)
+        self.assertEqual(body_states(restored.robots),
+                         body_states(engine.robots))
+        self.assertEqual(body_states(restored.pucks),
+                         body_states(engine.pucks))
+        self.assertEqual([robot.controller.summed_angular_speed
+                          for robot in restored.robots],
+                         [robot.controller.summed_angular_speed
+                          for robot in engine.robots])
+        self.assertEqual([(robot.command.linear, robot.command.angular)
+                          for robot in restored.robots],
+                         [(robot.command.linear, robot.command.angular)
+                          for robot in engine.robots])
+
+        # The restored engine carries on stepping.
+        for i in range(5):
+            restored.step()
+        self.assertEqual(restored.steps, engine.steps + 5)
+
+    def test_finished_run_resumes(self):
+        engine = self.make_engine({("AlvinSim", "number_steps"): 3})
+        engine.run()
+        self.assertTrue(engine.finished)
+        filename = os.path.join(os.path.dirname(engine.config_file),
+                                "test.ckpt")
+        engine.save_checkpoint(filename)
+
+        restored = load_checkpoint(filename)
+        self.assertFalse(restored.finished)
+        restored.number_steps = 10
+        restored.run()
+        self.assertEqual(restored.steps, 11)
+
+    def test_fork_reads_new_config(self):
+        # Another config already loaded in this process mustn't stand in for
+        # the one the fork is given.
+        engine = self.make_engine({("AlvinSim", "number_steps"): 3})
+        filename = os.path.join(os.path.dirname(engine.config_file),
+                                "test.ckpt")
+        engine.save_checkpoint(filename)
+        fork_config = self.make_config({("AlvinSim", "number_steps"): 7})
+        ConfigSingleton.reset_instance(engine.config_file)
+
+        fork = fork_checkpoint(filename, 1, fork_config)
+        self.assertEqual(fork.number_steps, 7)
+        self.assertEqual(ConfigSingleton.get_instance().getint(
+                             "AlvinSim", "number_steps"), 7)
+        fork.run()
+        self.assertEqual(fork.steps, 8)
+
+        restored = load_checkpoint(filename)
+        self.assertEqual(restored.number_steps, 3)
+        self.assertEqual(ConfigSingleton.get_instance().getint(
+                             "AlvinSim", "number_steps"), 3)
+
+if __name__ == '__main__':
+    unittest.main()
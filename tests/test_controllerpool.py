@@ -0,0 +1,53 @@
+import unittest
+from pymunk import Body
+
+from tests.support import EngineTestCase
+from common import Twist
+from controllerpool import ControllerPool
+
+class CountingController(object):
+    """ Counts its calls to react() and drives at that speed. """
+
+    def __init__(self):
+        self.calls = 0
+
+    def react(self, robot, sensor_suite, visualize=False):
+        self.calls += 1
+        twist = Twist()
+        twist.linear = self.calls
+        return twist
+
+class Robot(object):
+
+    def __init__(self):
+        self.body = Body(1, 1)
+        self.radius = 10
+        self.controller = CountingController()
+
+class ControllerPoolTest(unittest.TestCase):
+
+    def test_controllers_keep_their_identity(self):
+        robots = [Robot(), Robot()]
+        controllers = [robot.controller for robot in robots]
+        pool = ControllerPool(2)
+        self.addCleanup(pool.close)
+        for step in range(3):
+            twists = pool.react(robots, [{}, {}])
+        self.assertEqual([twist.linear for twist in twists], [3, 3])
+        for robot, controller in zip(robots, controllers):
+            self.assertIs(robot.controller, controller)
+            self.assertEqual(controller.calls, 3)
+
+class NoRobotsTest(EngineTestCase):
+
+    def test_step_without_robots(self):
+        engine = self.make_engine({("AlvinSim", "controller_processes"): 2,
+                                   ("AlvinSim", "number_robots"): 0,
+                                   ("AlvinSim", "number_pucks"): 5})
+        self.addCleanup(engine.finish)
+        for i in range(3):
+            engine.step()
+        self.assertEqual(engine.steps, 3)
+
+if __name__ == '__main__':
+    unittest.main()
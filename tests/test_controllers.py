@@ -0,0 +1,58 @@
+import unittest
+
+from tests.support import EngineTestCase
+from common import *
+from sensorsuite import SensorSuite
+
+class ReactBatchTest(EngineTestCase):
+    """ Each controller's react_batch() must give every robot the Twist its
+    own react() would. """
+
+    STEPS = 100
+
+    def check_controller(self, name, changes={}):
+        changes = dict(changes)
+        changes.update({("AlvinSim", "controller_name"): name,
+                        ("AlvinSim", "number_robots"): 10,
+                        ("AlvinSim", "number_pucks"): 150})
+        engine = self.make_engine(changes)
+        masks = [ARC_LANDMARK_MASK, BLAST_LANDMARK_MASK, POLE_LANDMARK_MASK]
+        for i in range(9):
+            engine.create_landmark((50 + 100 * (i % 3), 50 + 100 * (i // 3)),
+                                   masks[i % 3], 15)
+        engine.static_occluders.invalidate()
+
+        robots = engine.robots
+        controller = robots[0].controller
+        for step in range(self.STEPS):
+            batches = dict((scan, engine.scanner_for(robots[0], scan)
+                                        .compute_batch(engine.env, robots))
+                           for scan in controller.sensors)
+            commands = controller.react_batch(robots, batches)
+            self.assertNotEqual(commands, None)
+            (linear, angular) = commands
+            for i, robot in enumerate(robots):
+                scans = dict((scan, batch.scan(i))
+                             for scan, batch in batches.items())
+                twist = robot.controller.react(
+                            robot, SensorSuite(engine, robot, scans))
+                self.assertEqual((linear[i], angular[i]),
+                                 (twist.linear, twist.angular),
+                                 "{}, step {}, robot {}".format(name, step, i))
+            engine.step()
+
+    def test_gauci(self):
+        self.check_controller("GauciController")
+
+    def test_leftmost(self):
+        self.check_controller("LeftmostController")
+
+    def test_leftmost_modulated(self):
+        self.check_controller("LeftmostController",
+                              {("LeftmostController", "modulate"): True})
+
+    def test_simple_avoider(self):
+        self.check_controller("SimpleAvoidController")
+
+if __name__ == '__main__':
+    unittest.main()
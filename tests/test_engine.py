@@ -0,0 +1,35 @@
+import unittest
+
+from tests.support import EngineTestCase
+
+class SubstepTest(EngineTestCase):
+
+    def run_robot(self, substeps):
+        engine = self.make_engine({("AlvinSim", "physics_substeps"): substeps,
+                                   ("AlvinSim", "number_robots"): 1,
+                                   ("AlvinSim", "number_pucks"): 0})
+        for i in range(60):
+            engine.step()
+        return engine.robots[0].body
+
+    def test_substeps_only_change_accuracy(self):
+        # The number of substeps shouldn't change how hard robots are pushed.
+        body_2 = self.run_robot(2)
+        body_4 = self.run_robot(4)
+        self.assertLess(body_2.position.get_distance(body_4.position), 2.0)
+        self.assertAlmostEqual(body_2.velocity.length, body_4.velocity.length,
+                               delta=2.0)
+
+class PlacementTest(EngineTestCase):
+
+    def test_crowded_robots_placed(self):
+        # Past about 25 robots the default arena has no room for their
+        # bounding discs, but there is for their actual shapes.
+        engine = self.make_engine({("AlvinSim", "number_robots"): 40,
+                                   ("AlvinSim", "number_pucks"): 0})
+        self.assertEqual(len(engine.robots), 40)
+        for robot in engine.robots:
+            self.assertEqual(engine.env.shape_query(robot.shape), [])
+
+if __name__ == '__main__':
+    unittest.main()
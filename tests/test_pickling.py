@@ -0,0 +1,73 @@
+import pickle, unittest
+
+from common import Twist, RED_PUCK_MASK
+from sensorsuite import SensorSuite
+from sensors import DetectedPuck, DetectedRobot, DetectedLandmark
+from puck import Puck
+
+class Source(object):
+    """ Counts the scans taken through it. """
+
+    def __init__(self):
+        self.taken = []
+
+    def take_scan(self, robot, name, visualize):
+        self.taken.append(name)
+        return name + " of " + robot
+
+class TwistTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            twist = pickle.loads(pickle.dumps(Twist(1.5, -0.25), protocol))
+            self.assertEqual((twist.linear, twist.angular), (1.5, -0.25))
+
+class SensorSuiteTest(unittest.TestCase):
+
+    def test_scans_taken_once_when_read(self):
+        source = Source()
+        suite = SensorSuite(source, "robot", {"range_scan": "given"})
+        self.assertEqual(suite.range_scan, "given")
+        self.assertEqual(suite.puck_scan, "puck_scan of robot")
+        self.assertEqual(suite.puck_scan, "puck_scan of robot")
+        self.assertEqual(source.taken, ["puck_scan"])
+
+        suite.reset()
+        self.assertEqual(suite.range_scan, "range_scan of robot")
+        self.assertEqual(source.taken, ["puck_scan", "range_scan"])
+
+    def test_round_trip_drops_scans(self):
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            suite = SensorSuite(Source(), "robot", {"range_scan": "given"},
+                                True)
+            suite.puck_scan
+            copy = pickle.loads(pickle.dumps(suite, protocol))
+            self.assertEqual((copy.robot, copy.visualize), ("robot", True))
+            self.assertEqual(copy.source.taken, ["puck_scan"])
+            self.assertEqual(copy.range_scan, "range_scan of robot")
+            self.assertEqual(copy.source.taken, ["puck_scan", "range_scan"])
+
+class SlotsTest(unittest.TestCase):
+    # Classes with __slots__ and no pickled state of their own, which need
+    # protocol 2 or above (as checkpoints and worker processes use).
+
+    def test_detection_records(self):
+        for record in (DetectedPuck(10.0, 0.5, RED_PUCK_MASK),
+                       DetectedRobot(20.0, -1.0),
+                       DetectedLandmark(30.0, 2.0)):
+            copy = pickle.loads(pickle.dumps(record, pickle.HIGHEST_PROTOCOL))
+            self.assertIs(type(copy), type(record))
+            for name in record.__slots__:
+                self.assertEqual(getattr(copy, name), getattr(record, name))
+
+    def test_puck(self):
+        puck = Puck(0)
+        puck.body.position = (12, 34)
+        self.assertFalse(hasattr(puck, "__dict__"))
+        copy = pickle.loads(pickle.dumps(puck, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual((copy.kind, copy.immobile, copy.radius),
+                         (puck.kind, puck.immobile, puck.radius))
+        self.assertEqual(tuple(copy.body.position), (12, 34))
+
+if __name__ == '__main__':
+    unittest.main()
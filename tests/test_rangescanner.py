@@ -0,0 +1,119 @@
+import unittest
+import numpy as np
+
+from tests.support import EngineTestCase
+from configsingleton import ConfigSingleton
+from common import *
+from sensors.rangescanner import RangeScanner
+
+NONLANDMARKS = ("RangeScan:nonlandmarks",
+                WALL_MASK|ROBOT_MASK|ANY_PUCK_MASK|ANY_LANDMARK_MASK,
+                WALL_MASK|ROBOT_MASK|RED_PUCK_MASK)
+LANDMARKS = ("RangeScan:landmarks", WALL_MASK|ANY_LANDMARK_MASK,
+             WALL_MASK|ANY_LANDMARK_MASK)
+
+class RangeScannerTestCase(EngineTestCase):
+
+    def setUp(self):
+        # Let the robots wander among the pucks and landmarks for a while,
+        # so that the scans see a bit of everything.
+        self.engine = self.make_engine({("AlvinSim", "number_robots"): 10,
+                                        ("AlvinSim", "number_pucks"): 150})
+        masks = [ARC_LANDMARK_MASK, BLAST_LANDMARK_MASK, POLE_LANDMARK_MASK]
+        for i in range(9):
+            self.engine.create_landmark((50 + 100 * (i % 3),
+                                         50 + 100 * (i // 3)),
+                                        masks[i % 3], 15)
+        self.engine.static_occluders.invalidate()
+        for i in range(30):
+            self.engine.step()
+
+    def make_scanner(self, (section, detection_mask, acceptance_mask),
+                     algorithm, reuse=False):
+        config = ConfigSingleton.get_instance()
+        config.set(section, "algorithm", algorithm)
+        config.set(section, "reuse_scans", str(reuse))
+        return RangeScanner(section, detection_mask, acceptance_mask,
+                            self.engine.static_occluders)
+
+    def scans(self, scanner):
+        """ The ranges and masks of each robot's scan, as arrays. """
+        scans = [scanner.compute(self.engine.env, robot)
+                 for robot in self.engine.robots]
+        return (np.array([scan.ranges for scan in scans]),
+                np.array([scan.masks for scan in scans]))
+
+    def assertSameScans(self, (ranges1, masks1), (ranges2, masks2)):
+        self.assertEqual(masks1.tolist(), masks2.tolist())
+        np.testing.assert_allclose(ranges1, ranges2, atol=1e-6)
+
+class AlgorithmTest(RangeScannerTestCase):
+
+    def test_numpy_matches_segment_query(self):
+        for section in (NONLANDMARKS, LANDMARKS):
+            queried = self.scans(self.make_scanner(section, "segment_query"))
+            vectorized = self.scans(self.make_scanner(section, "numpy"))
+            self.assertSameScans(queried, vectorized)
+
+    def test_zbuffer_keeps_nearest_hits(self):
+        # The z-buffer may see a grazed shape which chipmunk's culling skips,
+        # so a few rays may come out nearer, but never farther.
+        for section in (NONLANDMARKS, LANDMARKS):
+            (ranges, masks) = self.scans(self.make_scanner(section,
+                                                           "segment_query"))
+            (z_ranges, z_masks) = self.scans(self.make_scanner(section,
+                                                               "zbuffer"))
+            differ = (masks != z_masks) | (np.abs(ranges - z_ranges) > 1e-6)
+            self.assertLess(differ.mean(), 0.01)
+            self.assertTrue((z_ranges <= ranges + 1e-6).all())
+
+class BatchTest(RangeScannerTestCase):
+
+    def test_batch_matches_single_scans(self):
+        for section in (NONLANDMARKS, LANDMARKS):
+            for algorithm in ("segment_query", "numpy"):
+                single = self.scans(self.make_scanner(section, algorithm))
+                batch = self.make_scanner(section, algorithm).compute_batch(
+                            self.engine.env, self.engine.robots)
+                self.assertEqual(len(batch), len(self.engine.robots))
+                self.assertSameScans(single, (batch.ranges, batch.masks))
+                scan = batch.scan(3)
+                self.assertEqual(scan.masks, single[1][3].tolist())
+
+class ReuseTest(RangeScannerTestCase):
+
+    SCANS = [(NONLANDMARKS, "segment_query"), (LANDMARKS, "numpy")]
+
+    def test_scan_reused_while_nothing_moves(self):
+        number_robots = len(self.engine.robots)
+        for section, algorithm in self.SCANS:
+            scanner = self.make_scanner(section, algorithm, reuse=True)
+            first = self.scans(scanner)
+            second = self.scans(scanner)
+            self.assertEqual(scanner.scans_cast, number_robots)
+            self.assertEqual(scanner.scans_reused, number_robots)
+            self.assertSameScans(first, second)
+
+    def test_reused_scans_match_fresh_ones(self):
+        for section, algorithm in self.SCANS:
+            scanner = self.make_scanner(section, algorithm, reuse=True)
+            for step in range(5):
+                reused = self.scans(scanner)
+                fresh = self.scans(self.make_scanner(section, algorithm))
+                self.assertSameScans(reused, fresh)
+                self.engine.step()
+            self.assertGreater(scanner.scans_cast, len(self.engine.robots))
+
+    def test_moving_static_shapes_recasts(self):
+        scanner = self.make_scanner(LANDMARKS, "numpy", reuse=True)
+        self.scans(scanner)
+        landmark = self.engine.landmarks[0]
+        landmark.body.position += (5, 0)
+        self.engine.env.reindex_shapes_for_body(landmark.body)
+        self.engine.static_occluders.invalidate()
+        self.assertSameScans(self.scans(scanner),
+                             self.scans(self.make_scanner(LANDMARKS, "numpy")))
+        self.assertEqual(scanner.scans_reused, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+from tests.support import EngineTestCase
+from sensorsuite import SensorSuite
+import controllers.rvoavoidercontroller as rvoavoidercontroller
+
+class FakeSimulator(object):
+    """ Stands in for rvo2.PyRVOSimulator.  Each doStep() moves every agent's
+    velocity halfway towards its preferred velocity, which is the same in any
+    frame of reference, and ignores obstacles and neighbours. """
+
+    def __init__(self, *args):
+        self.velocities = []
+        self.prefs = []
+
+    def addAgent(self, position):
+        self.velocities.append((0, 0))
+        self.prefs.append((0, 0))
+        return len(self.velocities) - 1
+
+    def addObstacle(self, vertices):
+        pass
+
+    def processObstacles(self):
+        pass
+
+    def setAgentPosition(self, agent, position):
+        pass
+
+    def setAgentVelocity(self, agent, velocity):
+        self.velocities[agent] = tuple(velocity)
+
+    def setAgentPrefVelocity(self, agent, velocity):
+        self.prefs[agent] = tuple(velocity)
+
+    def doStep(self):
+        self.velocities = [((vx + px) / 2.0, (vy + py) / 2.0) for
+                           ((vx, vy), (px, py)) in zip(self.velocities,
+                                                       self.prefs)]
+
+    def getAgentVelocity(self, agent):
+        return self.velocities[agent]
+
+class FakeRVO2(object):
+    PyRVOSimulator = FakeSimulator
+
+class RVOSwarmTest(EngineTestCase):
+
+    def setUp(self):
+        super(RVOSwarmTest, self).setUp()
+        self.rvo2 = rvoavoidercontroller.rvo2
+        rvoavoidercontroller.rvo2 = FakeRVO2
+
+    def tearDown(self):
+        rvoavoidercontroller.rvo2 = self.rvo2
+        super(RVOSwarmTest, self).tearDown()
+
+    def test_swarm_matches_react(self):
+        # With a simulator that ignores everything else, the swarm must pick
+        # the velocities each robot's react() would.
+        engine = self.make_engine(
+                     {("AlvinSim", "controller_name"): "RVOAvoiderController",
+                      ("RVOAvoiderController", "shared"): True,
+                      ("AlvinSim", "number_robots"): 8,
+                      ("AlvinSim", "number_pucks"): 20})
+        robots = engine.robots
+        controllers = [robot.controller for robot in robots]
+        for step in range(30):
+            states = [(c.last_index, c.last_mag) for c in controllers]
+            expected = []
+            for robot in robots:
+                twist = robot.controller.react(robot,
+                                               SensorSuite(engine, robot, {}))
+                expected.append((twist.linear, twist.angular,
+                                 robot.controller.last_index))
+
+            for c, (last_index, last_mag) in zip(controllers, states):
+                (c.last_index, c.last_mag) = (last_index, last_mag)
+            (linear, angular) = controllers[0].react_batch(robots, {})
+            for i, c in enumerate(controllers):
+                message = "step {}, robot {}".format(step, i)
+                self.assertAlmostEqual(linear[i], expected[i][0], msg=message)
+                self.assertAlmostEqual(angular[i], expected[i][1], msg=message)
+                self.assertEqual(c.last_index, expected[i][2], message)
+            engine.step()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import random, unittest
+import numpy as np
+from math import cos, sin, pi
+
+from tests.support import EngineTestCase
+from controllers.controller import Controller
+from sensors.rangescanner import ScanGeometry, BatchScan
+from sensors.scanruns import ScanRuns
+
+class MaskScan(object):
+    """ Just enough of a RangeScan for ScanRuns. """
+
+    def __init__(self, masks, ranges=None):
+        self.masks = np.array(masks)
+        if ranges == None:
+            ranges = [0] * len(masks)
+        self.ranges = np.array(ranges, dtype=float)
+        self.angle_array = np.linspace(-pi, pi, len(masks))
+
+    def arrays(self):
+        return self.ranges, self.masks
+
+class ScanRunsTest(unittest.TestCase):
+
+    def test_runs(self):
+        runs = ScanRuns(MaskScan([0, 0, 4, 4, 8, 0, 4]))
+        self.assertEqual(len(runs), 5)
+        self.assertEqual(runs.starts.tolist(), [0, 2, 4, 5, 6])
+        self.assertEqual(runs.stops.tolist(), [1, 3, 4, 5, 6])
+        self.assertEqual(runs.masks.tolist(), [0, 4, 8, 0, 4])
+
+    def test_spans_join_matching_runs(self):
+        runs = ScanRuns(MaskScan([0, 0, 4, 4, 8, 0, 4]))
+        self.assertEqual(runs.spans(4), [(2, 3), (6, 6)])
+        self.assertEqual(runs.spans(4 | 8), [(2, 4), (6, 6)])
+        self.assertEqual(runs.spans(16), [])
+
+    def test_spans_wrap(self):
+        runs = ScanRuns(MaskScan([4, 0, 4, 0, 4, 4]))
+        self.assertEqual(runs.spans(4, wrap=True), [(4, 0), (2, 2)])
+        self.assertEqual(ScanRuns(MaskScan([4, 4])).spans(4, wrap=True), [])
+
+    def test_run_ranges_and_angles(self):
+        scan = MaskScan([0, 4, 4, 8], [9, 3, 2, 5])
+        runs = ScanRuns(scan)
+        self.assertEqual(runs.min_ranges.tolist(), [9, 2, 5])
+        self.assertEqual(runs.start_angles.tolist(),
+                         scan.angle_array[[0, 1, 3]].tolist())
+        self.assertEqual(runs.stop_angles.tolist(),
+                         scan.angle_array[[0, 2, 3]].tolist())
+
+    def test_closest(self):
+        runs = ScanRuns(MaskScan([4, 4, 0, 8, 4, 4], [5, 3, 1, 2, 3, 4]))
+        self.assertEqual(runs.closest(4), 1)
+        self.assertEqual(runs.closest(4 | 8), 3)
+        self.assertEqual(runs.closest(16), None)
+
+    def test_vector_sum(self):
+        scan = MaskScan([0] * 6, [0, 1, 2, 3, 4, 5])
+        runs = ScanRuns(scan)
+        angles = scan.angle_array
+        for (first, last) in [(1, 3), (4, 1), (0, 5)]:
+            rays = range(first, last + 1) if first <= last else \
+                   range(first, 6) + range(0, last + 1)
+            for weighted in (False, True):
+                weights = [1.0 / (1 + i) if weighted else 1.0 for i in rays]
+                (x, y) = runs.vector_sum(first, last, weighted)
+                self.assertAlmostEqual(x, sum(w * cos(angles[i])
+                                              for w, i in zip(weights, rays)))
+                self.assertAlmostEqual(y, sum(w * sin(angles[i])
+                                              for w, i in zip(weights, rays)))
+
+    def test_leftmost(self):
+        runs = ScanRuns(MaskScan([4, 4, 0, 4, 4, 0]))
+        self.assertEqual(runs.leftmost(4), 4)
+        self.assertEqual(runs.leftmost(8), None)
+
+class Robot(object):
+    radius = 10
+
+class AngleTest(EngineTestCase):
+
+    def test_centroid_and_index_to_angle_agree(self):
+        # A scan with a single hit has its centroid along that ray.
+        self.make_config()
+        geometry = ScanGeometry("RangeScan:nonlandmarks", 4)
+        n = geometry.NUMBER_POINTS
+        controller = Controller()
+        for index in (0, n // 3, n - 1):
+            masks = np.zeros((1, n), dtype=int)
+            masks[0, index] = 4
+            ranges = np.zeros((1, n))
+            scan = BatchScan(geometry, [Robot()], ranges, masks).scan(0)
+            angle = controller.index_to_angle(scan, index)
+            self.assertEqual(angle, geometry.angles[index])
+            (cx, cy, found) = scan.centroid(4)
+            self.assertTrue(found)
+            self.assertAlmostEqual(cx * n, cos(angle))
+            self.assertAlmostEqual(cy * n, sin(angle))
+
+    def test_closest_and_centroid_match_loops(self):
+        # As the controllers computed them, ray by ray, before ScanRuns.
+        self.make_config()
+        geometry = ScanGeometry("RangeScan:landmarks", 4)
+        n = geometry.NUMBER_POINTS
+        controller = Controller()
+        random.seed(2)
+        for trial in range(20):
+            masks = np.array([[random.choice([0, 1, 4, 4, 8])
+                               for i in range(n)]])
+            ranges = np.array([[random.choice([10.0, 20.0, 30.0, 40.0])
+                                for i in range(n)]])
+            scan = BatchScan(geometry, [Robot()], ranges, masks).scan(0)
+
+            hits = [i for i in range(n) if masks[0, i] & 4]
+            i = min(hits, key=lambda i: ranges[0, i])
+            self.assertEqual(scan.closest(4), (ranges[0, i],
+                                               geometry.angles[i], 4))
+
+            for weighted in (False, True):
+                cx = cy = 0
+                found = False
+                for i in hits:
+                    angle = controller.index_to_angle(scan, i)
+                    if angle >= pi/2 or angle < -pi/2:
+                        continue
+                    value = 1.0 / (1.0 + ranges[0, i]) if weighted else 1.0
+                    cx += value * cos(angle)
+                    cy += value * sin(angle)
+                    found = True
+                (x, y, f) = scan.centroid(4, weighted)
+                self.assertEqual(f, found)
+                self.assertAlmostEqual(x, cx / n)
+                self.assertAlmostEqual(y, cy / n)
+
+if __name__ == '__main__':
+    unittest.main()
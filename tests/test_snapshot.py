@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+
+from tests.support import EngineTestCase
+from snapshot import WorldSnapshot
+
+class WorldSnapshotTest(EngineTestCase):
+
+    def setUp(self):
+        self.engine = self.make_engine({("AlvinSim", "number_robots"): 5,
+                                        ("AlvinSim", "number_pucks"): 40})
+        for i in range(10):
+            self.engine.step()
+
+    def test_matches_entities(self):
+        engine = self.engine
+        snapshot = engine.take_snapshot()
+        self.assertEqual(snapshot.step, engine.steps)
+        for i, puck in enumerate(engine.pucks):
+            self.assertEqual(tuple(snapshot.puck_positions[i]),
+                             tuple(puck.body.position))
+            self.assertEqual(snapshot.puck_kinds[i], puck.kind)
+            self.assertEqual(snapshot.puck_immobile[i], puck.immobile)
+        for i, robot in enumerate(engine.robots):
+            body = robot.body
+            self.assertEqual(tuple(snapshot.robot_positions[i]),
+                             tuple(body.position))
+            self.assertEqual(snapshot.robot_angles[i], body.angle)
+            self.assertEqual(tuple(snapshot.robot_velocities[i]),
+                             tuple(body.velocity))
+            self.assertEqual(snapshot.robot_states[i],
+                             robot.controller.state_code())
+
+    def test_refilled_in_place(self):
+        snapshot = self.engine.take_snapshot()
+        positions = snapshot.robot_positions
+        self.engine.step()
+        self.assertIs(self.engine.take_snapshot(snapshot), snapshot)
+        self.assertIs(snapshot.robot_positions, positions)
+        self.assertEqual(snapshot.step, self.engine.steps)
+        self.assertEqual(tuple(positions[0]),
+                         tuple(self.engine.robots[0].body.position))
+
+    def test_float32(self):
+        snapshot = self.engine.take_snapshot(dtype=np.float32)
+        self.assertEqual(snapshot.robot_positions.dtype, np.float32)
+        np.testing.assert_allclose(snapshot.robot_positions,
+                                   self.engine.take_snapshot().robot_positions,
+                                   rtol=1e-6)
+
+    def test_bad_dtype_and_sizes(self):
+        self.assertRaises(ValueError, WorldSnapshot, 1, 1, np.int32)
+        snapshot = WorldSnapshot(len(self.engine.pucks), 1)
+        self.assertRaises(ValueError, snapshot.fill, self.engine.pucks,
+                          self.engine.robots, 0)
+
+if __name__ == '__main__':
+    unittest.main()
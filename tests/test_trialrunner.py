@@ -0,0 +1,25 @@
+import unittest
+
+from tests.support import EngineTestCase
+from trialrunner import run_trial
+
+class RunTrialTest(EngineTestCase):
+
+    def test_config_error_recorded(self):
+        # A config rejected with sys.exit() must not escape a pool worker.
+        config_file = self.make_config(
+                          {("RangeScan:nonlandmarks", "algorithm"): "bogus"})
+        result = run_trial((config_file, 0))
+        self.assertIn("SystemExit", result.error)
+        self.assertIn("Unknown algorithm", result.error)
+
+    def test_trial_runs(self):
+        config_file = self.make_config({("AlvinSim", "number_steps"): 40,
+                                        ("AlvinSim", "number_robots"): 2,
+                                        ("AlvinSim", "number_pucks"): 10})
+        result = run_trial((config_file, 0))
+        self.assertEqual(result.error, None)
+        self.assertEqual(result.steps, [0, 20, 40])
+
+if __name__ == '__main__':
+    unittest.main()
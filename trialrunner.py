@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+""" Runs batches of headless trials on a pool of worker processes.  A job is a
+(config_file, trial_number) pair, or a (config_file, trial_number,
+checkpoint_file) triple to fork the trial from a saved checkpoint.  Each worker
+runs an AlvinEngine to completion and sends back the trial's metrics, so a
+sweep pays interpreter, pymunk and config startup once per worker rather than
+once per trial. """
+
+import os, sys, time, traceback
+from multiprocessing import Pool, cpu_count
+
+from alvinengine import AlvinEngine, fork_checkpoint
+from analysis import get_sec_moment
+from configsingleton import ConfigSingleton
+
+class TrialResult:
+    """ The metrics gathered from one trial.  If the trial raised an exception
+    then 'error' holds the formatted traceback. """
+
+    def __init__(self, config_file, trial_number):
+        self.config_file = config_file
+        self.trial_number = trial_number
+        self.output_dir = None
+        self.steps = []
+        self.sec_moments = []
+        self.error = None
+        self.wall_time = 0
+
+def run_trial(job):
+    """ Run a single job and return its TrialResult.  Exceptions, and the
+    sys.exit() calls used to reject bad configs, are caught and recorded in
+    the result so that one failing job doesn't take down its worker and stall
+    the others. """
+
+    config_file, trial_number = job[0], job[1]
+    result = TrialResult(config_file, trial_number)
+    start_time = time.time()
+    try:
+        ConfigSingleton.reset_instance(config_file)
+        if len(job) > 2:
+            engine = fork_checkpoint(job[2], trial_number, config_file)
+        else:
+            engine = AlvinEngine(config_file, trial_number)
+        result.output_dir = engine.output_dir
+        if engine.number_steps == -1:
+            raise ValueError("number_steps must be set to run a trial to "
+                             "completion")
+
+        snapshot = None
+        while not engine.finished:
+            if engine.steps % engine.capture_interval == 0:
+                snapshot = engine.take_snapshot(snapshot)
+                result.steps.append(engine.steps)
+                result.sec_moments.append(get_sec_moment(engine.pucks,
+                                                         snapshot))
+            engine.step()
+    except (Exception, SystemExit):
+        result.error = traceback.format_exc()
+    result.wall_time = time.time() - start_time
+    return result
+
+def run_trials(jobs, number_processes=None):
+    """ Run all jobs on 'number_processes' workers (by default, one per core)
+    and return their TrialResults in the same order as 'jobs'.  Progress and
+    failures are reported as each job completes. """
+
+    if number_processes == None:
+        number_processes = cpu_count()
+
+    results = [None] * len(jobs)
+    pool = Pool(number_processes)
+    try:
+        indexed_jobs = list(enumerate(jobs))
+        for i, result in pool.imap_unordered(_run_indexed_trial, indexed_jobs):
+            results[i] = result
+            done = len(results) - results.count(None)
+            if result.error == None:
+                print "[{}/{}] {} trial {}: {} samples in {:.1f}s".format(
+                    done, len(jobs), result.config_file, result.trial_number,
+                    len(result.sec_moments), result.wall_time)
+            else:
+                print "[{}/{}] {} trial {}: FAILED".format(
+                    done, len(jobs), result.config_file, result.trial_number)
+                print result.error
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    return results
+
+def _run_indexed_trial((i, job)):
+    return i, run_trial(job)
+
+def save_results(results):
+    """ Write each successful trial's second moments to 'sec_moment.dat' in
+    its output directory, in the same format used by analysis.py. """
+
+    for result in results:
+        if result.error != None:
+            continue
+        if not os.path.isdir(result.output_dir):
+            os.makedirs(result.output_dir)
+        output_file = open('{}/sec_moment.dat'.format(result.output_dir), 'w')
+        for sec_moment in result.sec_moments:
+            output_file.write(str(sec_moment) + '\n')
+        output_file.close()
+
+# make module runnable from command line
+if __name__ == '__main__':
+
+    if len(sys.argv) < 4:
+        print "usage:\n\ttrialrunner number_processes number_trials " \
+              "config_file [config_file ...]"
+        sys.exit(-1)
+
+    number_processes = int(sys.argv[1])
+    number_trials = int(sys.argv[2])
+    jobs = [(config_file, trial) for config_file in sys.argv[3:]
+                                 for trial in range(number_trials)]
+
+    results = run_trials(jobs, number_processes)
+    save_results(results)
+
+    failures = [result for result in results if result.error != None]
+    print "{} of {} trials failed".format(len(failures), len(results))